@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Query, status
+from app.api.routing import InstrumentedRoute
 from app.services.twitch import TwitchService
+from app.services.game_index import game_index
 from app.core.errors.exceptions import ResourceNotFoundException
 from app.api.schemas import AutocompleteResponse
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 twitch_service = TwitchService()
 
 @router.get(
@@ -13,7 +15,7 @@ twitch_service = TwitchService()
     description="Recherche et suggère des jeux dont le nom correspond à la requête",
     response_description="Liste de jeux correspondants avec leurs identifiants"
 )
-def autocomplete_games(
+async def autocomplete_games(
     game: str = Query(
         ..., 
         description="Nom partiel du jeu à rechercher",
@@ -22,13 +24,20 @@ def autocomplete_games(
     )
 ):
     """
-    Recherche des jeux sur Twitch dont le nom correspond partiellement à la requête.
+    Recherche des jeux dont le nom correspond partiellement à la requête.
+    
+    Les jeux sont d'abord cherchés dans le catalogue local, puis sur Twitch
+    si aucun ne correspond ; les jeux trouvés sur Twitch enrichissent le catalogue.
     
     - **game**: Texte de recherche (min. 2 caractères)
     
     Retourne une liste de jeux correspondants avec leurs identifiants.
     """
-    games = twitch_service.autocomplete_games(game)
+    games = game_index.search(game)
+    
+    if not games:
+        games = await twitch_service.autocomplete_games(game)
+        await game_index.feed(games)
     
     if not games:
         raise ResourceNotFoundException("Games", f"matching query: {game}")
@@ -0,0 +1,64 @@
+"""
+Conditional GET helpers for the stored video routes.
+
+A single video's ETag is derived from the `content_hash` stored by the
+upsert path and its trending score; a listing's ETag from its query
+parameters and the version of the games it covers. Both are known before
+any video is read, so a matching `If-None-Match` is answered with a 304
+straight away.
+"""
+import datetime
+import hashlib
+from typing import Any, Dict, Optional
+from fastapi import Request, Response
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# Period filters slide with the clock, their listings expire with it
+_SLIDING_PERIODS = ("day", "week", "month")
+_PERIOD_GRANULARITY_SECONDS = 60
+
+def _digest(*parts: Any) -> str:
+    return '"' + hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest() + '"'
+
+def video_etag(video: Dict[str, Any]) -> Optional[str]:
+    """ETag of a stored video, None for videos saved before content hashes were kept."""
+    if not video.get("content_hash"):
+        return None
+    return _digest(video["content_hash"], video.get("trending_score"))
+
+def list_etag(version: int, period: Optional[str], *params: Any) -> str:
+    clock = None
+    if period in _SLIDING_PERIODS:
+        clock = int(datetime.datetime.utcnow().timestamp()) // _PERIOD_GRANULARITY_SECONDS
+    # The encoder changes the bytes of the body, a strong ETag must follow it
+    return _digest(version, clock, settings.fast_json_responses, *params)
+
+def cache_control(updated_at: Optional[datetime.datetime], max_age_cap: Optional[int] = None) -> str:
+    """Lets recently ingested data be cached briefly and settled data for longer."""
+    max_age = settings.http_cache_min_max_age
+    if updated_at is not None:
+        age = (datetime.datetime.utcnow() - updated_at.replace(tzinfo=None)).total_seconds()
+        max_age = min(max(int(age / 10), settings.http_cache_min_max_age), settings.http_cache_max_max_age)
+    if max_age_cap is not None:
+        max_age = min(max_age, max_age_cap)
+    return f"public, max-age={max_age}"
+
+def list_cache_control(updated_at: Optional[datetime.datetime], period: Optional[str]) -> str:
+    return cache_control(updated_at, _PERIOD_GRANULARITY_SECONDS if period in _SLIDING_PERIODS else None)
+
+def is_not_modified(request: Request, etag: Optional[str]) -> bool:
+    if etag is None:
+        return False
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison
+    candidates = (candidate.strip() for candidate in header.split(","))
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+def not_modified_response(headers: Dict[str, str]) -> Response:
+    return Response(status_code=304, headers=headers)
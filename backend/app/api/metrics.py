@@ -0,0 +1,38 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.api.routing import InstrumentedRoute
+from app.core.metrics import registry
+from app.services.persistence import video_persistence_queue
+from app.services.video_search import video_search_service
+from app.services.video_lookup import video_lookup_service
+from app.services.facets import video_facet_service
+from app.services.game_index import game_index
+from app.services.twitch import game_resolver
+from app.services.token_manager import twitch_token_manager
+from app.services.rate_limiter import helix_rate_limiter
+from app.services.mongo_services import count_cache
+
+router = APIRouter(route_class=InstrumentedRoute)
+
+registry.register_collector("search_cache", video_search_service.stats)
+registry.register_collector("persistence_queue", video_persistence_queue.stats)
+registry.register_collector("video_lookup", video_lookup_service.stats)
+registry.register_collector("video_facets", video_facet_service.stats)
+registry.register_collector("game_index", game_index.stats)
+registry.register_collector("game_resolver", game_resolver.stats)
+registry.register_collector("twitch_token", twitch_token_manager.stats)
+registry.register_collector("helix_rate_limit", helix_rate_limiter.stats)
+registry.register_collector("videos_count_cache", count_cache.stats)
+
+@router.get(
+    "/metrics",
+    summary="Métriques Prometheus",
+    description="Latences par route, appels Twitch et MongoDB, et compteurs internes au format texte Prometheus",
+    response_class=PlainTextResponse,
+    include_in_schema=False
+)
+def get_metrics():
+    """
+    Expose les métriques de l'API au format texte Prometheus.
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
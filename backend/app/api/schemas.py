@@ -32,14 +32,46 @@ class VideoResponse(VideoBase):
 # Réponses d'API
 class PaginatedResponse(BaseModel):
     """Base pour les réponses paginées"""
-    total: int = Field(..., description="Nombre total d'éléments")
+    total: Optional[int] = Field(None, description="Nombre total d'éléments (absent si non demandé)")
     page: int = Field(..., description="Numéro de page actuel")
     page_size: int = Field(..., description="Nombre d'éléments par page")
-    pages: int = Field(..., description="Nombre total de pages")
+    pages: Optional[int] = Field(None, description="Nombre total de pages (absent si non demandé)")
 
 class VideoListResponse(PaginatedResponse):
     """Liste paginée de vidéos"""
     videos: List[Dict[str, Any]] = Field(..., description="Liste des vidéos")
+    next_cursor: Optional[str] = Field(None, description="Jeton de continuation de la page suivante")
+
+class VideoSearchResponse(VideoListResponse):
+    """Liste paginée de vidéos d'un ou plusieurs jeux"""
+    total: Optional[int] = Field(None, description="Nombre total de vidéos, connu seulement une fois la fin des résultats atteinte")
+    pages: Optional[int] = Field(None, description="Nombre total de pages, connu seulement une fois la fin des résultats atteinte")
+    has_more: bool = Field(False, description="Vrai s'il reste des vidéos après cette page")
+    partial: bool = Field(False, description="Vrai si certains jeux manquent dans les résultats")
+    incomplete_game_ids: List[str] = Field(default_factory=list, description="Jeux trop lents ou en erreur, absents des résultats")
+
+class VideoBatchRequest(BaseModel):
+    """Identifiants des vidéos à récupérer"""
+    ids: List[str] = Field(..., min_length=1, description="Identifiants des vidéos, dans l'ordre souhaité")
+
+class VideoBatchResponse(BaseModel):
+    """Vidéos trouvées, dans l'ordre de la requête"""
+    videos: List[Dict[str, Any]] = Field(..., description="Vidéos trouvées, dans l'ordre des identifiants demandés")
+    missing: List[str] = Field(..., description="Identifiants introuvables en base comme sur Twitch")
+
+class FacetCount(BaseModel):
+    """Nombre de vidéos pour une valeur de filtre"""
+    value: str = Field(..., description="Valeur du filtre")
+    count: int = Field(..., description="Nombre de vidéos")
+
+class VideoFacetsResponse(BaseModel):
+    """Répartition des vidéos enregistrées d'un jeu"""
+    game_id: str = Field(..., description="Identifiant du jeu")
+    total: int = Field(..., description="Nombre total de vidéos du jeu")
+    languages: List[FacetCount] = Field(..., description="Vidéos par langue, les plus nombreuses d'abord")
+    periods: Dict[str, int] = Field(..., description="Vidéos par période ('day', 'week', 'month', 'all')")
+    top_users: List[FacetCount] = Field(..., description="Créateurs ayant le plus de vidéos")
+    source: str = Field(..., description="'rollup' (compteurs maintenus à l'enregistrement) ou 'aggregation' (calcul à la demande)")
 
 class AutocompleteResponse(BaseModel):
     """Résultat d'une recherche d'autocomplétion"""
@@ -1,28 +1,65 @@
-from typing import Optional
-from fastapi import APIRouter, Query, Path, status
-from app.services.twitch import TwitchService
-from app.services.mongo_services import save_multiple_videos, get_videos_from_db
-from app.models.models import Video
+from itertools import islice
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Query, Path, Request, Response, status
+from fastapi.responses import StreamingResponse
+from app.api.routing import InstrumentedRoute
+from app.services.mongo_services import open_export_cursor
+from app.services.video_repository import video_repository
+from app.services.export import EXPORT_FORMATS
+from app.services.video_search import merge_videos, video_search_service
+from app.services.video_lookup import video_lookup_service
+from app.services.facets import video_facet_service
+from app.services.game_index import game_index
 from app.core.errors.exceptions import ResourceNotFoundException, ValidationException
-from app.api.schemas import VideoListResponse, VideoResponse
+from app.api.schemas import (
+    VideoBatchRequest,
+    VideoBatchResponse,
+    VideoFacetsResponse,
+    VideoListResponse,
+    VideoResponse,
+    VideoSearchResponse,
+)
+from app.core.config import get_settings
+from app.core.responses import FastJSONResponse
+from app.api.conditional import (
+    cache_control,
+    is_not_modified,
+    list_cache_control,
+    list_etag,
+    not_modified_response,
+    video_etag,
+)
 
-router = APIRouter()
-twitch_service = TwitchService()
+router = APIRouter(route_class=InstrumentedRoute)
+settings = get_settings()
+
+def video_list_response(
+    content: Dict[str, Any],
+    response: Optional[Response] = None,
+    headers: Optional[Dict[str, str]] = None
+):
+    """Encodes a video list directly when fast responses are enabled, the videos come from Helix or MongoDB as is."""
+    if settings.fast_json_responses:
+        return FastJSONResponse(content, headers=headers)
+    if response is not None and headers:
+        response.headers.update(headers)
+    return content
 
 @router.get(
     "/search",
-    response_model=VideoListResponse,
+    response_model=VideoSearchResponse,
     summary="Rechercher des vidéos Twitch par jeu",
     description="""
-    Recherche des vidéos sur Twitch pour un jeu spécifique.
+    Recherche des vidéos sur Twitch pour un ou plusieurs jeux.
     
     Les résultats peuvent être filtrés par langue et période, et triés selon différents critères.
-    Les vidéos trouvées sont automatiquement sauvegardées dans la base de données.
+    Avec plusieurs jeux, les vidéos sont fusionnées selon le tri demandé.
+    Les vidéos trouvées sont sauvegardées dans la base de données en arrière-plan.
     """,
     response_description="Liste paginée de vidéos Twitch"
 )
-def search_videos(
-    game_id: str = Query(..., description="ID du jeu à rechercher", example="21779"),
+async def search_videos(
+    game_id: List[str] = Query(..., description="ID du jeu à rechercher, répétable ou séparés par des virgules", example=["21779"]),
     language: Optional[str] = Query(None, description="Filtrer par langue (ex: 'fr', 'en')"),
     sort: Optional[str] = Query(None, description="Trier par 'time', 'trending' ou 'views'"),
     period: Optional[str] = Query(None, description="Filtrer par 'day', 'week', 'month', ou 'all'"),
@@ -30,45 +67,78 @@ def search_videos(
     page_size: int = Query(20, description="Nombre de vidéos par page", ge=1, le=100)
 ):
     """
-    Recherche des vidéos sur Twitch pour un jeu spécifique avec différentes options de filtrage.
+    Recherche des vidéos sur Twitch pour un ou plusieurs jeux avec différentes options de filtrage.
     
-    - **game_id**: Identifiant du jeu sur Twitch
+    - **game_id**: Identifiant du jeu sur Twitch (plusieurs jeux possibles)
     - **language**: Code de langue (fr, en, etc.)
     - **sort**: Méthode de tri (time, trending, views)
     - **period**: Période de recherche (day, week, month, all)
     - **page**: Numéro de la page pour la pagination
     - **page_size**: Nombre d'éléments par page
+    
+    Si un jeu est trop lent ou en erreur, les résultats des autres jeux sont
+    renvoyés avec `partial` à vrai et le jeu dans `incomplete_game_ids`.
+
+    Les pages suivantes ne sont récupérées qu'à la demande : `has_more`
+    indique s'il reste des vidéos, et `total` et `pages` ne sont renseignés
+    qu'une fois la fin des résultats atteinte. Seules les
+    `twitch_search_max_results` premières vidéos sont accessibles.
     """
     if page < 1 or page_size < 1:
         raise ValidationException("Page et page_size doivent être des entiers positifs")
     
-    videos_data = twitch_service.get_videos_by_game_id(
-        game_id=game_id,
+    game_ids = list(dict.fromkeys(
+        value.strip() for values in game_id for value in values.split(",") if value.strip()
+    ))
+    if not game_ids:
+        raise ValidationException("Au moins un game_id est requis")
+    if len(game_ids) > settings.search_max_games:
+        raise ValidationException(f"Au plus {settings.search_max_games} jeux par recherche")
+    
+    # Only fetch as many Helix pages as the requested page needs, from each game
+    max_results = settings.twitch_search_max_results
+    start = (page - 1) * page_size
+    if start >= max_results:
+        raise ValidationException(f"La recherche est limitée aux {max_results} premières vidéos")
+    end = min(start + page_size, max_results)
+
+    result = await video_search_service.search_many(
+        game_ids,
         language=language,
         sort=sort,
-        period=period
+        period=period,
+        max_results=end,
+        # A single game has no other results to return early
+        deadline=settings.search_fanout_deadline if len(game_ids) > 1 else None
     )
+    
+    fetched = sum(len(videos) for videos in result.videos_by_game.values())
+    if fetched == 0 and not result.partial:
+        raise ResourceNotFoundException("Videos", f"game_id: {', '.join(game_ids)}")
 
-    if not videos_data:
-        raise ResourceNotFoundException("Videos", f"game_id: {game_id}")
+    for searched_game_id in result.videos_by_game:
+        game_index.record_selection(searched_game_id)
 
-    videos = [Video(**{**video, "game_id": game_id}) for video in videos_data]
-    
-    save_multiple_videos(videos)
+    # Merge lazily, only the requested page is materialized
+    merged = merge_videos(result.videos_by_game.values(), sort)
+    paginated_videos = list(islice(merged, start, end))
 
-    # Apply pagination
-    start = (page - 1) * page_size
-    end = start + page_size
-    paginated_videos = videos_data[start:end]
-    total_pages = -(-len(videos_data) // page_size)  # Ceiling division
+    # Only the first `max_results` merged videos are served, past them the per-game lists are cut
+    has_more = end < max_results and (fetched > end or result.has_more)
+    total = None
+    if not result.has_more and not result.partial:
+        total = min(fetched, max_results)
 
-    return {
+    return video_list_response({
         "videos": paginated_videos,
-        "total": len(videos_data),
+        "total": total,
         "page": page,
         "page_size": page_size,
-        "pages": total_pages
-    }
+        "pages": -(-total // page_size) if total is not None else None,  # Ceiling division
+        "has_more": has_more,
+        "partial": result.partial,
+        "incomplete_game_ids": result.timed_out + result.failed
+    })
 
 
 @router.get(
@@ -78,13 +148,18 @@ def search_videos(
     description="Récupère les vidéos sauvegardées dans la base de données avec possibilité de filtrage.",
     response_description="Liste paginée de vidéos depuis la base de données"
 )
-def get_videos(
+async def get_videos(
+    request: Request,
+    response: Response,
     game_id: Optional[str] = Query(None, description="Filtrer par ID de jeu"),
     language: Optional[str] = Query(None, description="Filtrer par langue (ex: 'fr', 'en')"),
-    sort: Optional[str] = Query(None, description="Trier par 'time', 'trending' ou 'views'"),
+    sort: Optional[str] = Query(None, description="Trier par 'time' (défaut), 'trending' ou 'views'"),
     period: Optional[str] = Query(None, description="Filtrer par 'day', 'week', 'month', ou 'all'"),
     page: int = Query(1, description="Numéro de page, à partir de 1", ge=1),
-    page_size: int = Query(20, description="Nombre de vidéos par page", ge=1, le=100)
+    page_size: int = Query(20, description="Nombre de vidéos par page", ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Jeton `next_cursor` de la page précédente (remplace `page`)"),
+    with_total: bool = Query(True, description="Calculer le nombre total de vidéos"),
+    q: Optional[str] = Query(None, min_length=2, description="Recherche plein texte dans le titre et la description")
 ):
     """
     Récupère les vidéos enregistrées dans la base de données avec différentes options de filtrage.
@@ -95,32 +170,157 @@ def get_videos(
     - **period**: Filtrer par période
     - **page**: Numéro de page pour la pagination
     - **page_size**: Nombre d'éléments par page
+    - **cursor**: Jeton de continuation, pour parcourir les pages en temps constant
+    - **with_total**: Désactiver pour ne pas calculer le total
+    - **q**: Recherche plein texte ; sans `sort`, les résultats sont classés par pertinence
+    
+    Répond `304 Not Modified` si l'en-tête `If-None-Match` correspond à l'ETag de la page.
     """
     if page < 1 or page_size < 1:
         raise ValidationException("Page et page_size doivent être des entiers positifs")
     
+    # Revalidation only needs the version of the listed games, not the videos
+    version = await video_repository.get_version(game_id)
+    etag = list_etag(version["version"], period, game_id, language, sort, page, page_size, cursor, with_total, q)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": list_cache_control(version["updated_at"], period)
+    }
+    if is_not_modified(request, etag):
+        return not_modified_response(headers)
+    
     # Calculate pagination values
     skip = (page - 1) * page_size
     limit = page_size
     
-    result = get_videos_from_db(
+    result = await video_repository.find_videos(
         game_id=game_id,
         language=language,
         sort=sort,
         period=period,
         skip=skip,
-        limit=limit
+        limit=limit,
+        cursor=cursor,
+        with_total=with_total,
+        q=q,
+        version=version["version"]
     )
     
-    total_pages = -(-result["total_count"] // page_size) if result["total_count"] > 0 else 0
+    total_pages = None
+    if result["total_count"] is not None:
+        total_pages = -(-result["total_count"] // page_size) if result["total_count"] > 0 else 0
     
-    return {
+    return video_list_response({
         "videos": result["videos"],
         "total": result["total_count"],
         "page": page,
         "page_size": page_size,
-        "pages": total_pages
+        "pages": total_pages,
+        "next_cursor": result["next_cursor"]
+    }, response, headers)
+
+
+@router.get(
+    "/videos/export",
+    summary="Exporter les vidéos enregistrées",
+    description="Exporte en flux continu (NDJSON ou CSV) toutes les vidéos correspondant aux filtres de `/api/videos`.",
+    response_description="Flux NDJSON ou CSV des vidéos",
+    response_class=StreamingResponse
+)
+def export_videos(
+    game_id: Optional[str] = Query(None, description="Filtrer par ID de jeu"),
+    language: Optional[str] = Query(None, description="Filtrer par langue (ex: 'fr', 'en')"),
+    sort: Optional[str] = Query(None, description="Trier par 'time' (défaut), 'trending' ou 'views'"),
+    period: Optional[str] = Query(None, description="Filtrer par 'day', 'week', 'month', ou 'all'"),
+    q: Optional[str] = Query(None, min_length=2, description="Recherche plein texte dans le titre et la description"),
+    format: str = Query("ndjson", description="Format d'export : 'ndjson' ou 'csv'"),
+    cursor: Optional[str] = Query(None, description="Champ `cursor` de la dernière vidéo reçue, pour reprendre un export interrompu")
+):
+    """
+    Exporte les vidéos enregistrées sans pagination.
+    
+    - **game_id**, **language**, **sort**, **period**, **q**: mêmes filtres que `/api/videos`
+    - **format**: `ndjson` (une vidéo JSON par ligne) ou `csv`
+    - **cursor**: reprend l'export juste après la vidéo portant ce jeton (champ `cursor` de chaque ligne)
+    """
+    if format not in EXPORT_FORMATS:
+        raise ValidationException("Le format doit être 'ndjson' ou 'csv'")
+    
+    serializer, media_type = EXPORT_FORMATS[format]
+    videos = open_export_cursor(
+        game_id=game_id,
+        language=language,
+        sort=sort,
+        period=period,
+        q=q,
+        cursor=cursor
+    )
+    
+    return StreamingResponse(
+        serializer(videos, sort),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="videos.{format}"'}
+    )
+
+
+@router.get(
+    "/videos/facets",
+    response_model=VideoFacetsResponse,
+    summary="Répartition des vidéos d'un jeu",
+    description="Nombre de vidéos enregistrées d'un jeu par langue, par période et par créateur, pour afficher les filtres.",
+    response_description="Compteurs par langue, période et créateur"
+)
+async def get_video_facets(
+    request: Request,
+    response: Response,
+    game_id: str = Query(..., description="ID du jeu"),
+    top_users: int = Query(settings.facets_top_users, description="Nombre de créateurs à retourner", ge=1, le=100)
+):
+    """
+    Retourne en une requête les compteurs des filtres de `/api/videos` pour un jeu.
+    
+    - **game_id**: Identifiant du jeu
+    - **top_users**: Nombre de créateurs à retourner, ceux ayant le plus de vidéos d'abord
+    
+    Les compteurs sont lus depuis un cumul mis à jour à chaque enregistrement de vidéos ;
+    s'il ne correspond plus au nombre de vidéos du jeu, ils sont recalculés à la demande.
+    Répond `304 Not Modified` si l'en-tête `If-None-Match` correspond à l'ETag.
+    """
+    version = await video_repository.get_version(game_id)
+    # The period counts slide with the clock like a `period` listing
+    etag = list_etag(version["version"], "day", "facets", game_id, top_users)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": list_cache_control(version["updated_at"], "day")
     }
+    if is_not_modified(request, etag):
+        return not_modified_response(headers)
+    
+    response.headers.update(headers)
+    return await video_facet_service.get_facets(game_id, top_users)
+
+
+@router.post(
+    "/videos/batch",
+    response_model=VideoBatchResponse,
+    summary="Récupérer plusieurs vidéos par ID",
+    description="Récupère jusqu'à plusieurs centaines de vidéos en une requête, depuis la base puis Twitch pour les vidéos absentes ou anciennes.",
+    response_description="Vidéos trouvées, dans l'ordre de la requête"
+)
+async def get_videos_batch(request: VideoBatchRequest):
+    """
+    Récupère plusieurs vidéos par leurs identifiants.
+    
+    - **ids**: Identifiants des vidéos (les doublons sont ignorés)
+    
+    Les vidéos absentes de la base ou pas mises à jour depuis longtemps sont
+    récupérées sur Twitch et enregistrées en arrière-plan. Les identifiants
+    introuvables sont listés dans `missing`.
+    """
+    if len(request.ids) > settings.video_batch_max_ids:
+        raise ValidationException(f"Au plus {settings.video_batch_max_ids} identifiants par requête")
+    
+    return video_list_response(await video_lookup_service.lookup(request.ids))
 
 
 @router.get(
@@ -130,7 +330,9 @@ def get_videos(
     description="Récupère les détails d'une vidéo spécifique par son identifiant.",
     response_description="Détails complets d'une vidéo"
 )
-def get_video_by_id(
+async def get_video_by_id(
+    request: Request,
+    response: Response,
     video_id: str = Path(..., description="ID de la vidéo à récupérer")
 ):
     """
@@ -138,11 +340,26 @@ def get_video_by_id(
     
     - **video_id**: Identifiant unique de la vidéo
     
-    Retourne les détails complets de la vidéo si elle existe.
+    Retourne les détails complets de la vidéo si elle existe, ou `304 Not Modified`
+    si l'en-tête `If-None-Match` correspond à son ETag.
     """
-    video = get_videos_from_db(video_id=video_id)
+    if request.headers.get("if-none-match"):
+        validator = await video_repository.get_validator(video_id)
+        if not validator:
+            raise ResourceNotFoundException("Video", video_id)
+        etag = video_etag(validator)
+        if is_not_modified(request, etag):
+            return not_modified_response({
+                "ETag": etag,
+                "Cache-Control": cache_control(validator.get("last_sample_at"))
+            })
     
-    if not video:
-        raise ResourceNotFoundException("Video", video_id)
+    video = await video_repository.get_video(video_id)
+    # The ETag is derived from the document actually sent
+    etag = video_etag(video)
+    if etag:
+        response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control(video.pop("last_sample_at", None))
+    video.pop("content_hash", None)
     
     return video
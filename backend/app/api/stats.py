@@ -0,0 +1,42 @@
+from fastapi import APIRouter
+from app.api.routing import InstrumentedRoute
+from app.services.persistence import video_persistence_queue
+from app.services.video_search import video_search_service
+from app.services.video_lookup import video_lookup_service
+from app.services.facets import video_facet_service
+from app.services.game_index import game_index
+from app.services.twitch import game_resolver
+from app.services.token_manager import twitch_token_manager
+from app.services.rate_limiter import helix_rate_limiter
+
+router = APIRouter(route_class=InstrumentedRoute)
+
+@router.get(
+    "/stats",
+    summary="Statistiques internes",
+    description="Compteurs du cache de recherche, de la file de sauvegarde des vidéos et du catalogue de jeux",
+    response_description="Compteurs par composant"
+)
+def get_stats():
+    """
+    Retourne les compteurs internes de l'API.
+
+    - **search_cache**: hits, misses et requêtes fusionnées du cache de `/api/search`
+    - **persistence_queue**: profondeur, attente et pertes de la file de sauvegarde
+    - **video_lookup**: vidéos servies depuis la base ou rafraîchies sur Twitch par `/api/videos/batch`
+    - **video_facets**: lectures des cumuls de `/api/videos/facets`, recalculs à la demande et reconstructions
+    - **game_index**: taille et hits du catalogue local de jeux
+    - **game_resolver**: résolutions nom/ID de jeux servies par le cache, la base ou Helix
+    - **twitch_token**: récupérations et invalidations du jeton d'application Twitch
+    - **helix_rate_limit**: quota Helix restant, files d'attente et temps d'attente par priorité
+    """
+    return {
+        "search_cache": video_search_service.stats(),
+        "persistence_queue": video_persistence_queue.stats(),
+        "video_lookup": video_lookup_service.stats(),
+        "video_facets": video_facet_service.stats(),
+        "game_index": game_index.stats(),
+        "game_resolver": game_resolver.stats(),
+        "twitch_token": twitch_token_manager.stats(),
+        "helix_rate_limit": helix_rate_limiter.stats(),
+    }
@@ -8,9 +8,102 @@ class Settings(BaseSettings):
     twitch_token_url: str = "https://id.twitch.tv/oauth2/token"
     twitch_api_url: str = "https://api.twitch.tv/helix"
 
+    # App access token sharing (seconds)
+    twitch_token_refresh_margin: float = 600.0
+    twitch_token_lease_seconds: float = 10.0
+    twitch_token_shared_wait: float = 5.0
+
+    # Twitch HTTP connection pool (shared by every TwitchService)
+    twitch_http_max_connections: int = 100
+    twitch_http_max_keepalive_connections: int = 20
+    twitch_http_keepalive_expiry: float = 30.0
+    twitch_http_timeout: float = 10.0
+    twitch_http_connect_timeout: float = 5.0
+    twitch_search_max_results: int = 1000
+
+    # Helix rate limit scheduling (points kept for user-facing calls, max waits in seconds)
+    twitch_rate_limit_interactive_reserve: int = 100
+    twitch_rate_limit_max_wait_interactive: float = 5.0
+    twitch_rate_limit_max_wait_background: float = 60.0
+
+    # /api/search response cache (TTL in seconds, per sort)
+    search_cache_max_entries: int = 256
+    search_cache_max_videos: int = 50000  # Across all cached searches, a Helix video takes about 2 KB
+    search_cache_ttl_time: float = 30.0
+    search_cache_ttl_trending: float = 60.0
+    search_cache_ttl_views: float = 300.0
+
+    # Multi-game /api/search (deadline in seconds before partial results)
+    search_max_games: int = 10
+    search_fanout_concurrency: int = 4
+    search_fanout_deadline: float = 3.0
+
+    # Background ingestion worker (python -m app.workers.ingest)
+    ingest_game_ids: str = ""  # Comma-separated Twitch game IDs
+    ingest_interval_seconds: float = 300.0
+    ingest_concurrency: int = 4
+    ingest_max_videos_per_game: int = 500
+
+    # Local game catalogue used by /api/autocomplete
+    game_index_refresh_interval: float = 60.0
+
+    # Game name/ID resolution (games refreshed from Helix after `refresh_after`
+    # seconds, unknown names remembered for `negative_ttl` seconds)
+    game_resolver_cache_size: int = 10000
+    game_resolver_refresh_after: float = 7 * 24 * 3600.0
+    game_resolver_negative_ttl: float = 300.0
+
+    # Batch video lookup (/api/videos/batch); older videos are refreshed from Helix
+    video_batch_max_ids: int = 500
+    video_batch_stale_after: float = 3600.0
+
+    # Video facets (/api/videos/facets); drifted rollups are rebuilt at most once per interval
+    facets_top_users: int = 10
+    facets_rollup_rebuild_interval: float = 300.0
+    facets_rollup_verify_interval: float = 60.0  # Seconds between two checks of a game's rollup count
+    facets_rollup_max_age: float = 3600.0  # Seconds before a rollup is rebuilt to catch updated videos
+
+    # Skip response model validation on video lists (uses orjson when installed)
+    fast_json_responses: bool = False
+    
+    # Span export to an OpenTelemetry collector, disabled when empty (e.g. http://localhost:4317)
+    otel_exporter_otlp_endpoint: str = ""
+    otel_service_name: str = "twitch-searcher-api"
+
     # Mongo settings
     mongodb_uri: str = "mongodb://localhost:27017"
     mongodb_db_name: str = "twitch_search_db"
+    # Connection pool of each worker process (milliseconds for the timeouts)
+    mongodb_max_pool_size: int = 100
+    mongodb_min_pool_size: int = 0
+    mongodb_max_idle_time_ms: int = 300000
+    mongodb_server_selection_timeout_ms: int = 5000
+    mongodb_connect_timeout_ms: int = 5000
+    mongodb_bulk_batch_size: int = 500
+    videos_count_cache_size: int = 1024
+    videos_count_cache_ttl: float = 30.0
+    export_batch_size: int = 1000
+    video_versions_cache_ttl: float = 1.0
+
+    # Conditional GET on /api/videos: Cache-Control max-age is a tenth of the
+    # time since the data last changed, within these bounds (seconds)
+    http_cache_min_max_age: int = 5
+    http_cache_max_max_age: int = 300
+
+    # View count samples and trending score
+    view_samples_retention_days: int = 90
+    trending_window_hours: float = 24.0
+    trending_min_sample_interval_minutes: float = 10.0
+
+    # Startup warm-up (MongoDB connection, Twitch token), seconds before serving without it
+    startup_warmup_timeout: float = 5.0
+
+    # Write-behind persistence queue
+    persistence_queue_maxsize: int = 10000
+    persistence_batch_size: int = 500
+    persistence_flush_interval: float = 1.0
+    persistence_enqueue_timeout: float = 0.5  # Wait for room in a full queue, background callers only
+    persistence_drain_timeout: float = 10.0
 
     class Config:
         env_file = ".env"
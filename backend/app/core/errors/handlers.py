@@ -2,9 +2,11 @@ from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
-import traceback
+import logging
 from .exceptions import AppException
 
+logger = logging.getLogger(__name__)
+
 def setup_error_handlers(app: FastAPI):    
     @app.exception_handler(AppException)
     async def app_exception_handler(request: Request, exc: AppException):
@@ -56,8 +58,7 @@ def setup_error_handlers(app: FastAPI):
     
     @app.exception_handler(Exception)
     async def generic_exception_handler(request: Request, exc: Exception):
-        print(f"Unhandled exception: {str(exc)}")
-        print(traceback.format_exc())
+        logger.error("Unhandled exception on %s %s", request.method, request.url.path, exc_info=exc)
         
         return JSONResponse(
             status_code=500,
@@ -0,0 +1,220 @@
+"""
+In-process metrics rendered in the Prometheus text exposition format.
+
+Metrics are updated from the event loop and from threadpool workers, so
+each one guards its samples with a lock; an observation is a dict lookup,
+a bisect and an addition. Component statistics that already exist (cache,
+queues, rate limiter) are not duplicated here: collectors registered with
+`register_collector` are read at scrape time and exported as gauges.
+"""
+import abc
+import bisect
+import functools
+import inspect
+import math
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
+from app.core.tracing import span
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_INVALID_NAME_CHARS = re.compile(r"[^a-zA-Z0-9_]")
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _Metric(abc.ABC):
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.type_name}"
+        yield from self._render_samples()
+
+    @abc.abstractmethod
+    def _render_samples(self) -> Iterator[str]:
+        """Yields the sample lines of the metric, after its HELP and TYPE lines."""
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def _render_samples(self) -> Iterator[str]:
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float):
+        with self._lock:
+            self._values[labels] = value
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (+Inf last), sum]
+        self._values: Dict[Tuple[str, ...], List[Any]] = {}
+
+    def observe(self, value: float, *labels: str):
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][position] += 1
+            entry[1] += value
+
+    def _render_samples(self) -> Iterator[str]:
+        with self._lock:
+            values = [(labels, list(counts), total) for labels, (counts, total) in self._values.items()]
+        for labels, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+
+class MetricsRegistry:
+    def __init__(self, prefix: str = "twitch_searcher"):
+        self.prefix = prefix
+        self._metrics: List[_Metric] = []
+        self._collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(f"{self.prefix}_{name}", documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(f"{self.prefix}_{name}", documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._add(Histogram(f"{self.prefix}_{name}", documentation, labelnames, buckets))
+
+    def register_collector(self, component: str, collect: Callable[[], Dict[str, Any]]):
+        """Exports the numeric values of `collect()` (nested dicts flattened) as gauges at scrape time."""
+        self._collectors[component] = collect
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for component, collect in self._collectors.items():
+            for key, value in sorted(self._flatten(collect()).items()):
+                name = _INVALID_NAME_CHARS.sub("_", f"{self.prefix}_{component}_{key}")
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _add(self, metric: _Metric):
+        self._metrics.append(metric)
+        return metric
+
+    @classmethod
+    def _flatten(cls, stats: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+        flat: Dict[str, float] = {}
+        for key, value in stats.items():
+            if isinstance(value, dict):
+                flat.update(cls._flatten(value, f"{prefix}{key}_"))
+            elif isinstance(value, bool):
+                flat[f"{prefix}{key}"] = float(value)
+            elif isinstance(value, (int, float)):
+                flat[f"{prefix}{key}"] = value
+        return flat
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "API request latency by route", ("method", "route", "status")
+)
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "API requests being handled by route", ("method", "route")
+)
+twitch_request_duration = registry.histogram(
+    "twitch_request_duration_seconds", "Twitch API call latency by endpoint", ("endpoint", "status")
+)
+mongo_operation_duration = registry.histogram(
+    "mongo_operation_duration_seconds", "MongoDB operation latency", ("operation", "outcome")
+)
+
+def timed_mongo(operation: str):
+    """Records the duration of a MongoDB access function or coroutine, labelled with whether it raised."""
+    attributes = {"db.system": "mongodb", "db.operation": operation}
+
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                outcome = "error"
+                try:
+                    with span(f"mongo.{operation}", **attributes):
+                        result = await fn(*args, **kwargs)
+                    outcome = "ok"
+                    return result
+                finally:
+                    mongo_operation_duration.observe(time.perf_counter() - started, operation, outcome)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                with span(f"mongo.{operation}", **attributes):
+                    result = fn(*args, **kwargs)
+                outcome = "ok"
+                return result
+            finally:
+                mongo_operation_duration.observe(time.perf_counter() - started, operation, outcome)
+        return wrapper
+    return decorator
@@ -0,0 +1,26 @@
+import json
+from typing import Any
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # Optional dependency, the stdlib encoder is used instead
+    orjson = None
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response encoding its content in a single pass.
+
+    Returning a response instance from a route bypasses the `response_model`
+    validation and `jsonable_encoder` walk, while the model still documents
+    the route in the OpenAPI schema. Only use it for content already known to
+    match the model, such as documents read from MongoDB or Helix.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
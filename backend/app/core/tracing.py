@@ -0,0 +1,53 @@
+"""
+Optional OpenTelemetry spans around Twitch and MongoDB calls.
+
+Tracing is enabled when `OTEL_EXPORTER_OTLP_ENDPOINT` is set and the
+`opentelemetry-sdk` and `opentelemetry-exporter-otlp-proto-grpc` packages
+are installed; spans are then batched to that collector. Otherwise `span()`
+returns a shared no-op context manager.
+"""
+import logging
+from contextlib import nullcontext
+from typing import Any, ContextManager, Optional
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_NO_SPAN = nullcontext()
+_tracer: Optional[Any] = None
+
+def setup_tracing() -> bool:
+    global _tracer
+    settings = get_settings()
+    if not settings.otel_exporter_otlp_endpoint or _tracer is not None:
+        return _tracer is not None
+    try:
+        from opentelemetry import trace
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        logger.warning("OTEL_EXPORTER_OTLP_ENDPOINT is set but OpenTelemetry is not installed, tracing disabled")
+        return False
+
+    provider = TracerProvider(resource=Resource.create({"service.name": settings.otel_service_name}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=settings.otel_exporter_otlp_endpoint)))
+    trace.set_tracer_provider(provider)
+    _tracer = trace.get_tracer(__name__)
+    logger.info("Exporting spans to %s", settings.otel_exporter_otlp_endpoint)
+    return True
+
+def shutdown_tracing():
+    global _tracer
+    if _tracer is None:
+        return
+    from opentelemetry import trace
+
+    trace.get_tracer_provider().shutdown()
+    _tracer = None
+
+def span(name: str, **attributes: Any) -> ContextManager:
+    if _tracer is None:
+        return _NO_SPAN
+    return _tracer.start_as_current_span(name, attributes=attributes)
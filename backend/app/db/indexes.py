@@ -0,0 +1,208 @@
+"""
+Declarative index registry for the videos and games collections, and
+setup of the view samples time series collection.
+
+Every filter/sort combination exposed by /api/videos is listed in
+`video_query_shapes()`, and `VIDEO_INDEXES` holds the indexes that serve
+them without a collection scan or an in-memory sort. Indexes follow the
+equality/sort/range rule: equality filters (`game_id`, `language`) first,
+then the sort keys, with the `created_at` range filter last.
+
+Run `python -m app.db.indexes --check` against a local mongod to verify
+the query plans, or `--build` to create the indexes.
+"""
+import argparse
+import itertools
+import logging
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.collection import Collection
+from pymongo.database import Database
+from pymongo.errors import CollectionInvalid
+from app.db.pagination import seek_filter
+
+logger = logging.getLogger(__name__)
+
+# Sort options accepted by the API, as (field, direction) pairs. Each one
+# ends with `id` so the order is total and usable for keyset pagination.
+VIDEO_SORTS: Dict[str, List[Tuple[str, int]]] = {
+    "time": [("created_at", DESCENDING), ("id", DESCENDING)],
+    "views": [("view_count", DESCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+    # Decayed score, see app.db.trending
+    "trending": [("trending_rank", DESCENDING), ("id", DESCENDING)],
+}
+
+# Sort used when the request does not ask for one
+DEFAULT_KEYSET_SORT = "time"
+
+# Full-text searches without an explicit sort are ranked by relevance
+RELEVANCE_SORT: List[Tuple[str, Any]] = [("score", {"$meta": "textScore"}), ("id", DESCENDING)]
+TEXT_SCORE_PROJECTION: Dict[str, Any] = {"score": {"$meta": "textScore"}}
+
+# Equality filters that can be combined on /api/videos
+EQUALITY_PREFIXES: List[Tuple[str, ...]] = [
+    (),
+    ("game_id",),
+    ("language",),
+    ("game_id", "language"),
+]
+
+# One index family per sort
+_SORT_FAMILIES: List[List[Tuple[str, int]]] = list(VIDEO_SORTS.values())
+
+# Sort key values used to build sample keyset queries for the plan check
+_SAMPLE_VALUES: Dict[str, Any] = {
+    "created_at": "2020-01-01T00:00:00Z",
+    "view_count": 100,
+    "trending_rank": 20000.5,
+    "id": "1000000000",
+}
+
+def _build_video_indexes() -> List[IndexModel]:
+    indexes = [IndexModel([("id", ASCENDING)], unique=True)]
+    for prefix, sort_keys in itertools.product(EQUALITY_PREFIXES, _SORT_FAMILIES):
+        keys = [(field, ASCENDING) for field in prefix] + sort_keys
+        indexes.append(IndexModel(keys))
+    # Titles weigh more than descriptions; no stemming since videos are multilingual
+    indexes.append(IndexModel(
+        [("title", TEXT), ("description", TEXT)],
+        weights={"title": 10, "description": 2},
+        default_language="none",
+        name="videos_text",
+    ))
+    return indexes
+
+VIDEO_INDEXES: List[IndexModel] = _build_video_indexes()
+
+def ensure_video_indexes(collection: Collection) -> List[str]:
+    """Creates the registered indexes (no-op for the ones that already exist)."""
+    names = collection.create_indexes(VIDEO_INDEXES)
+    logger.info("Video indexes ready: %s", ", ".join(names))
+    return names
+
+# Games: lookups by id and incremental reloads of the autocomplete index
+GAME_INDEXES: List[IndexModel] = [
+    IndexModel([("id", ASCENDING)], unique=True),
+    IndexModel([("name_key", ASCENDING)]),
+    IndexModel([("updated_at", ASCENDING)]),
+]
+
+def ensure_game_indexes(collection: Collection) -> List[str]:
+    names = collection.create_indexes(GAME_INDEXES)
+    logger.info("Game indexes ready: %s", ", ".join(names))
+    return names
+
+# Per-channel video counts of the facet rollups, one document per (game, user name)
+ROLLUP_USER_INDEXES: List[IndexModel] = [
+    IndexModel([("game_id", ASCENDING), ("user_name", ASCENDING)], unique=True),
+    IndexModel([("game_id", ASCENDING), ("count", DESCENDING)]),
+]
+
+def ensure_rollup_user_indexes(collection: Collection) -> List[str]:
+    names = collection.create_indexes(ROLLUP_USER_INDEXES)
+    logger.info("Rollup user indexes ready: %s", ", ".join(names))
+    return names
+
+def ensure_view_sample_collection(database: Database, retention_days: int) -> None:
+    """
+    Creates the `video_view_samples` time series collection, bucketed per
+    video (`video_id` is the meta field) at an hourly granularity.
+    """
+    try:
+        database.create_collection(
+            "video_view_samples",
+            timeseries={"timeField": "ts", "metaField": "video_id", "granularity": "hours"},
+            expireAfterSeconds=retention_days * 24 * 3600,
+        )
+        logger.info("Created the video_view_samples time series collection")
+    except CollectionInvalid:
+        pass  # Already exists
+
+def _filter_shapes() -> Iterator[Dict[str, Any]]:
+    for prefix in EQUALITY_PREFIXES:
+        for with_period in (False, True):
+            filter_query: Dict[str, Any] = {field: "x" for field in prefix}
+            if with_period:
+                filter_query["created_at"] = {"$gte": "2000-01-01T00:00:00Z"}
+            yield filter_query
+
+def video_query_shapes() -> Iterator[Tuple[Dict[str, Any], List[Tuple[str, int]]]]:
+    """
+    Yields a (filter, sort) pair for every query shape /api/videos can issue,
+    including the keyset-paginated variant of each one.
+    """
+    for filter_query in _filter_shapes():
+        for sort_keys in VIDEO_SORTS.values():
+            sample_values = [_SAMPLE_VALUES[field] for field, _ in sort_keys]
+            yield filter_query, sort_keys
+            yield seek_filter(filter_query, sort_keys, sample_values), sort_keys
+
+def video_text_query_shapes() -> Iterator[Tuple[Dict[str, Any], List[Tuple[str, Any]]]]:
+    """
+    Yields the full-text variants of the /api/videos query shapes.
+
+    Text matches are sorted after the TEXT stage, so only a COLLSCAN is a
+    problem for these.
+    """
+    for filter_query in _filter_shapes():
+        text_query = {**filter_query, "$text": {"$search": "sample"}}
+        yield text_query, RELEVANCE_SORT
+        for sort_keys in VIDEO_SORTS.values():
+            yield text_query, sort_keys
+
+def _plan_stages(plan: Any) -> Iterator[str]:
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _plan_stages(value)
+
+def _find_bad_stages(collection: Collection, shapes, forbidden: set, limit: int) -> List[str]:
+    problems = []
+    for filter_query, sort in shapes:
+        projection = {"_id": 0, **(TEXT_SCORE_PROJECTION if "$text" in filter_query else {})}
+        cursor = collection.find(filter_query, projection).sort(sort).limit(limit)
+        winning_plan = cursor.explain()["queryPlanner"]["winningPlan"]
+        bad_stages = forbidden & set(_plan_stages(winning_plan))
+        if bad_stages:
+            problems.append(f"filter={filter_query} sort={sort}: {', '.join(sorted(bad_stages))}")
+    return problems
+
+def check_video_query_plans(collection: Collection, limit: int = 20) -> List[str]:
+    """
+    Explains every supported query shape and returns a description of each
+    one whose winning plan uses a COLLSCAN or an in-memory SORT (a COLLSCAN
+    only, for full-text shapes).
+    """
+    return (
+        _find_bad_stages(collection, video_query_shapes(), {"COLLSCAN", "SORT"}, limit)
+        + _find_bad_stages(collection, video_text_query_shapes(), {"COLLSCAN"}, limit)
+    )
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from app.db.mongo import get_collection
+
+    parser = argparse.ArgumentParser(description="Manage the videos collection indexes")
+    parser.add_argument("--build", action="store_true", help="create the registered indexes")
+    parser.add_argument("--check", action="store_true", help="fail if a query shape is not index-backed")
+    args = parser.parse_args(argv)
+
+    collection = get_collection()
+    if args.build or args.check:
+        ensure_video_indexes(collection)
+    if args.check:
+        problems = check_video_query_plans(collection)
+        for problem in problems:
+            print(problem)
+        if problems:
+            return 1
+        print("All video query shapes are index-backed")
+    return 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -1,13 +1,144 @@
-from pymongo import MongoClient, ASCENDING
+"""
+Process-wide MongoDB clients.
+
+Clients are created on first use rather than at import, so importing the
+app neither connects to MongoDB nor opens a pool that forked workers would
+inherit: PyMongo clients are not fork-safe, and a process that did not
+create a client opens its own. The API opens them in its lifespan
+(`connect_mongo`, `connect_async_mongo`) and closes them on shutdown.
+
+The `AsyncMongoClient` serves the request path (see `video_repository`)
+without holding a threadpool thread per query; it belongs to the event
+loop it was created in. The synchronous client serves the rest (exports,
+games, tokens, index builds). Both use the `mongodb_*` pool settings.
+"""
+import asyncio
+import os
+import threading
+from typing import Any, Dict, Optional
+from pymongo import AsyncMongoClient, MongoClient
+from pymongo.asynchronous.collection import AsyncCollection
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.collection import Collection
+from pymongo.database import Database
 from app.core.config import get_settings
 
-settings = get_settings()
+_client: Optional[MongoClient] = None
+_client_pid: Optional[int] = None
+_collections: Dict[str, Collection] = {}
+_lock = threading.Lock()
+
+_async_client: Optional[AsyncMongoClient] = None
+_async_client_owner: Optional[tuple] = None
+_async_collections: Dict[str, AsyncCollection] = {}
+
+def _client_options() -> Dict[str, Any]:
+    settings = get_settings()
+    return {
+        "maxPoolSize": settings.mongodb_max_pool_size,
+        "minPoolSize": settings.mongodb_min_pool_size,
+        "maxIdleTimeMS": settings.mongodb_max_idle_time_ms,
+        "serverSelectionTimeoutMS": settings.mongodb_server_selection_timeout_ms,
+        "connectTimeoutMS": settings.mongodb_connect_timeout_ms,
+        "appname": settings.otel_service_name,
+    }
+
+def get_client() -> MongoClient:
+    global _client, _client_pid
+    if _client is not None and _client_pid == os.getpid():
+        return _client
+    with _lock:
+        if _client is None or _client_pid != os.getpid():
+            # Connections are opened lazily, by the first operation or `connect_mongo`
+            _client = MongoClient(get_settings().mongodb_uri, **_client_options())
+            _client_pid = os.getpid()
+            _collections.clear()
+    return _client
+
+def get_async_client() -> AsyncMongoClient:
+    """Returns the async client of the running event loop, created on first use."""
+    global _async_client, _async_client_owner
+    owner = (os.getpid(), asyncio.get_running_loop())
+    if _async_client is None or _async_client_owner != owner:
+        _async_client = AsyncMongoClient(get_settings().mongodb_uri, **_client_options())
+        _async_client_owner = owner
+        _async_collections.clear()
+    return _async_client
+
+async def connect_async_mongo():
+    await get_async_client().admin.command("ping")
+
+async def close_async_mongo():
+    global _async_client, _async_client_owner
+    client, owner = _async_client, _async_client_owner
+    _async_client = None
+    _async_client_owner = None
+    _async_collections.clear()
+    if client is not None and owner == (os.getpid(), asyncio.get_running_loop()):
+        await client.close()
+
+def connect_mongo():
+    """Opens the client and waits for a first connection to the server."""
+    get_client().admin.command("ping")
+
+def close_mongo():
+    global _client, _client_pid
+    with _lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = None
+        _client_pid = None
+        _collections.clear()
+
+def get_database() -> Database:
+    return get_client()[get_settings().mongodb_db_name]
+
+def _collection(name: str) -> Collection:
+    database = get_database()
+    collection = _collections.get(name)
+    if collection is None:
+        collection = _collections[name] = database[name]
+    return collection
+
+def get_collection() -> Collection:
+    return _collection("videos")
+
+def get_game_collection() -> Collection:
+    return _collection("games")
+
+def get_token_collection() -> Collection:
+    return _collection("app_tokens")
+
+def get_ingest_state_collection() -> Collection:
+    return _collection("ingest_state")
+
+def get_video_rollup_collection() -> Collection:
+    return _collection("video_rollups")
+
+def get_video_rollup_user_collection() -> Collection:
+    return _collection("video_rollup_users")
+
+def get_async_database() -> AsyncDatabase:
+    return get_async_client()[get_settings().mongodb_db_name]
+
+def _async_collection(name: str) -> AsyncCollection:
+    database = get_async_database()
+    collection = _async_collections.get(name)
+    if collection is None:
+        collection = _async_collections[name] = database[name]
+    return collection
+
+def get_async_collection() -> AsyncCollection:
+    return _async_collection("videos")
+
+def get_async_view_sample_collection() -> AsyncCollection:
+    return _async_collection("video_view_samples")
 
-client = MongoClient(settings.mongodb_uri)
-db = client[settings.mongodb_db_name]
+def get_async_video_version_collection() -> AsyncCollection:
+    return _async_collection("video_versions")
 
-video_collection = db["videos"]
-video_collection.create_index([("id", ASCENDING)], unique=True)
+def get_async_video_rollup_collection() -> AsyncCollection:
+    return _async_collection("video_rollups")
 
-def get_collection():
-    return video_collection
\ No newline at end of file
+def get_async_video_rollup_user_collection() -> AsyncCollection:
+    return _async_collection("video_rollup_users")
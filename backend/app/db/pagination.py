@@ -0,0 +1,68 @@
+"""
+Keyset (seek) pagination helpers for the videos collection.
+
+A continuation token records the sort mode and the sort key values of the
+last video returned (the video `id` is always the final tiebreaker). The
+next page is fetched with a filter that starts right after those values,
+so it reads the index from the seek point instead of skipping documents.
+"""
+import base64
+import binascii
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.errors.exceptions import ValidationException
+
+def encode_cursor(sort: str, document: Dict[str, Any], sort_keys: List[Tuple[str, int]]) -> str:
+    payload = {"s": sort, "k": [document.get(field) for field, _ in sort_keys]}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+def decode_cursor(token: str, sort: str, sort_keys: List[Tuple[str, int]]) -> List[Any]:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = payload["k"]
+        token_sort = payload["s"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise ValidationException("Cursor invalide")
+
+    if token_sort != sort or not isinstance(values, list) or len(values) != len(sort_keys):
+        raise ValidationException("Le cursor ne correspond pas au tri demandé")
+    return values
+
+def _merge_condition(filter_query: Dict[str, Any], field: str, condition: Any) -> Dict[str, Any]:
+    merged = dict(filter_query)
+    existing = merged.get(field)
+    if isinstance(existing, dict) and isinstance(condition, dict):
+        merged[field] = {**existing, **condition}
+    else:
+        merged[field] = condition
+    return merged
+
+def seek_filter(
+    filter_query: Dict[str, Any],
+    sort_keys: List[Tuple[str, int]],
+    values: Optional[List[Any]]
+) -> Dict[str, Any]:
+    """
+    Returns `filter_query` restricted to the documents after `values` in
+    `sort_keys` order.
+
+    The condition is expanded into one `$or` branch per sort key, each
+    carrying the base filter, so every branch gets tight index bounds and
+    MongoDB can merge the branches in sort order without scanning past
+    pages.
+    """
+    if values is None:
+        return filter_query
+
+    branches = []
+    for position, (field, direction) in enumerate(sort_keys):
+        branch = filter_query
+        for (previous_field, _), previous_value in zip(sort_keys[:position], values[:position]):
+            branch = _merge_condition(branch, previous_field, previous_value)
+        operator = "$lt" if direction < 0 else "$gt"
+        branch = _merge_condition(branch, field, {operator: values[position]})
+        branches.append(branch)
+
+    return {"$or": branches}
@@ -0,0 +1,87 @@
+"""
+Trending score maintained by the video upsert path.
+
+Every ingestion of a video compares its view count with the last sample
+kept on the document and folds the views-per-hour rate into an
+exponentially decaying average:
+
+    score = rate * (1 - exp(-dt / window)) + previous_score * exp(-dt / window)
+
+where `dt` is the number of hours since the last sample. Samples closer
+than `min_interval_hours` keep the previous score and sample, so the rate
+is always measured over a meaningful interval. A video seen for the first
+time starts with its lifetime rate (views per hour since `created_at`).
+
+A score is only refreshed when its video is ingested again, and most
+videos stop being ingested once they are past the crawlers' high-water
+marks. The trending sort therefore reads `trending_rank`, the score
+decayed to a common time base:
+
+    rank = ln(score) + last_sample_at / window
+
+Comparing ranks compares `score * exp(-(now - last_sample_at) / window)`,
+each score decayed since its last sample, for any `now`. A video nobody
+samples again loses one unit of rank per window behind the ones that are,
+without any write.
+
+Both are computed server-side by an update pipeline, so concurrent
+upserts of the same video cannot interleave a read and a write.
+"""
+import datetime
+from typing import Any, Dict, List
+
+_MS_PER_HOUR = 3600 * 1000
+
+# Scores below this many views per hour share the lowest rank
+_MIN_RANKED_SCORE = 1e-3
+
+def initial_trending_score(view_count: int, created_at: str, now: datetime.datetime) -> float:
+    try:
+        created = datetime.datetime.strptime(created_at, "%Y-%m-%dT%H:%M:%SZ")
+    except (TypeError, ValueError):
+        return 0.0
+    age_hours = (now - created).total_seconds() / 3600
+    return view_count / max(age_hours, 1.0)
+
+def trending_update_pipeline(
+    document: Dict[str, Any],
+    now: datetime.datetime,
+    window_hours: float,
+    min_interval_hours: float
+) -> List[Dict[str, Any]]:
+    """
+    Returns the update pipeline upserting `document` and refreshing its
+    `trending_score`, `trending_rank`, `last_sample_at` and `last_sample_views` fields.
+    """
+    views = document.get("view_count", 0)
+    initial = initial_trending_score(views, document.get("created_at"), now)
+
+    hours_since_sample = {"$divide": [{"$subtract": [now, "$last_sample_at"]}, _MS_PER_HOUR]}
+    too_recent = {"$and": [{"$ne": ["$$dt", None]}, {"$lt": ["$$dt", min_interval_hours]}]}
+    decay = {"$exp": {"$divide": [{"$multiply": [-1, "$$dt"]}, window_hours]}}
+    rate = {"$divide": [{"$max": [0, {"$subtract": [views, "$last_sample_views"]}]}, "$$dt"]}
+    previous_score = {"$ifNull": ["$trending_score", 0]}
+
+    def with_dt(expression: Dict[str, Any]) -> Dict[str, Any]:
+        return {"$let": {"vars": {"dt": hours_since_sample}, "in": expression}}
+
+    # Plain values are wrapped in $literal so strings starting with "$" are not read as field paths
+    fields = {key: {"$literal": value} for key, value in document.items()}
+    fields["trending_score"] = with_dt({"$switch": {
+        "branches": [
+            {"case": {"$eq": ["$$dt", None]}, "then": initial},
+            {"case": too_recent, "then": previous_score},
+        ],
+        "default": {"$add": [
+            {"$multiply": [rate, {"$subtract": [1, decay]}]},
+            {"$multiply": [previous_score, decay]},
+        ]},
+    }})
+    fields["last_sample_at"] = with_dt({"$cond": [too_recent, "$last_sample_at", now]})
+    fields["last_sample_views"] = with_dt({"$cond": [too_recent, "$last_sample_views", views]})
+
+    # Computed in a second stage, from the score and sample time just set
+    sample_windows = {"$divide": [{"$toLong": "$last_sample_at"}, window_hours * _MS_PER_HOUR]}
+    rank = {"$add": [{"$ln": {"$max": ["$trending_score", _MIN_RANKED_SCORE]}}, sample_windows]}
+
+    return [{"$set": fields}, {"$set": {"trending_rank": rank}}]
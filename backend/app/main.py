@@ -1,14 +1,75 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
 
 from app.api.search import router as search_router
 from app.api.autocomplete import router as autocomplete_router
+from app.api.stats import router as stats_router
+from app.api.metrics import router as metrics_router
+from app.core.config import get_settings
 from app.core.errors.handlers import setup_error_handlers
+from app.core.tracing import setup_tracing, shutdown_tracing
+from app.db.mongo import close_async_mongo, close_mongo, connect_async_mongo, connect_mongo
+from app.services.http_client import close_http_client, get_http_client
+from app.services.persistence import video_persistence_queue
+from app.services.mongo_services import create_indexes
+from app.services.game_index import game_index
+from app.services.token_manager import twitch_token_manager
+
+logger = logging.getLogger(__name__)
+
+async def build_indexes():
+    try:
+        await run_in_threadpool(create_indexes)
+    except Exception:
+        logger.exception("Background index build failed")
+
+async def warm_up_step(name: str, step: Awaitable, timeout: float):
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(step, timeout)
+        logger.info("%s ready in %.0f ms", name, (time.perf_counter() - started) * 1000)
+    except Exception as e:
+        logger.warning("%s warm-up failed, continuing without it: %r", name, e)
+
+async def warm_up():
+    """Connects to MongoDB and prefetches the Twitch token concurrently, so the first requests don't pay for it."""
+    timeout = get_settings().startup_warmup_timeout
+    await asyncio.gather(
+        warm_up_step("MongoDB connection", run_in_threadpool(connect_mongo), timeout),
+        warm_up_step("MongoDB async connection", connect_async_mongo(), timeout),
+        warm_up_step("Twitch token", twitch_token_manager.get_token(), timeout),
+    )
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Clients are created here, in the worker process, never at import
+    setup_tracing()
+    get_http_client()
+    await warm_up()
+    # Index builds can take a while on a large collection, don't block startup on them
+    index_build = asyncio.create_task(build_indexes())
+    await video_persistence_queue.start()
+    await game_index.start()
+    yield
+    index_build.cancel()
+    await game_index.stop()
+    await video_persistence_queue.drain()
+    await close_http_client()
+    await close_async_mongo()
+    await run_in_threadpool(close_mongo)
+    shutdown_tracing()
 
 app = FastAPI(
     title="Twitch Video Searcher API",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -60,6 +121,14 @@ app.include_router(
     tags=["autocomplete"],
 )
 
+app.include_router(
+    stats_router,
+    prefix="/api",
+    tags=["info"],
+)
+
+app.include_router(metrics_router)
+
 @app.get("/", tags=["info"])
 def read_root():
     """
@@ -71,6 +140,10 @@ def read_root():
         "endpoints_disponibles": [
             "/api/search - Recherche de vidéos via l'API Twitch",
             "/api/videos - Recherche de vidéos depuis la base de données",
-            "/api/autocomplete - Autocomplétion des noms de jeux"
+            "/api/videos/batch - Récupération de plusieurs vidéos par ID",
+            "/api/videos/facets - Répartition des vidéos d'un jeu par langue, période et créateur",
+            "/api/autocomplete - Autocomplétion des noms de jeux",
+            "/api/stats - Statistiques du cache et de la file de sauvegarde",
+            "/metrics - Métriques au format Prometheus"
         ]
     }
@@ -32,12 +32,29 @@ class Video(BaseModel):
         json_encoders = {ObjectId: str}
 
     def to_mongo_dict(self) -> Dict[str, Any]:
-        mongo_dict = {
-            k: v for k, v in self.dict(by_alias=True).items()
-            if k != "_id" and v is not None and v != ""
-        }
-        
-        if "thumbnail_url" in mongo_dict and "%{" in mongo_dict["thumbnail_url"]:
-            mongo_dict["thumbnail_url"] = mongo_dict["thumbnail_url"].replace("%{width}", "1920").replace("%{height}", "1080")
-        
-        return mongo_dict
\ No newline at end of file
+        return helix_video_to_mongo(self.dict())
+
+# Stored fields, in the order of the Video model
+VIDEO_FIELDS = tuple(name for name in Video.model_fields if name != "mongo_id")
+
+def helix_video_to_mongo(video: Dict[str, Any], game_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Converts a Helix video item into the document stored in MongoDB.
+
+    Same output as `Video(**video).to_mongo_dict()` in a single pass over the
+    stored fields: unknown keys, None and empty values are dropped and the
+    thumbnail size placeholders are filled in. Meant for the ingestion path,
+    where Helix output is trusted and building a model per video is wasted work.
+    """
+    document = {}
+    for field in VIDEO_FIELDS:
+        value = video.get(field)
+        if value is not None and value != "":
+            document[field] = value
+    if game_id:
+        document["game_id"] = game_id
+
+    thumbnail_url = document.get("thumbnail_url")
+    if thumbnail_url and "%{" in thumbnail_url:
+        document["thumbnail_url"] = thumbnail_url.replace("%{width}", "1920").replace("%{height}", "1080")
+    return document
\ No newline at end of file
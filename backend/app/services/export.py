@@ -0,0 +1,61 @@
+import csv
+import io
+import json
+import logging
+from typing import Any, Dict, Iterator, Optional
+from pymongo.cursor import Cursor
+from pymongo.errors import PyMongoError
+from app.core.config import get_settings
+from app.services.mongo_services import EXPORT_FIELDS, with_resume_token
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Each row ends with the token resuming the export after it
+CSV_FIELDS = [*EXPORT_FIELDS, "cursor"]
+
+def _chunked(lines: Iterator[str], cursor: Cursor) -> Iterator[bytes]:
+    """
+    Groups serialized lines into chunks of one cursor batch, so memory use
+    stays bounded by `export_batch_size` whatever the result size.
+    """
+    buffer = []
+    try:
+        for line in lines:
+            buffer.append(line)
+            if len(buffer) >= settings.export_batch_size:
+                yield "".join(buffer).encode()
+                buffer = []
+        if buffer:
+            yield "".join(buffer).encode()
+    except PyMongoError:
+        # Headers are already sent, the truncated body is the only signal left
+        logger.exception("Video export interrupted")
+    finally:
+        cursor.close()
+
+def stream_ndjson(cursor: Cursor, sort: Optional[str] = None) -> Iterator[bytes]:
+    def lines() -> Iterator[str]:
+        for document in cursor:
+            document = with_resume_token(document, sort)
+            yield json.dumps(document, ensure_ascii=False, separators=(",", ":"), default=str) + "\n"
+    return _chunked(lines(), cursor)
+
+def stream_csv(cursor: Cursor, sort: Optional[str] = None) -> Iterator[bytes]:
+    def lines() -> Iterator[str]:
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for document in cursor:
+            writer.writerow(with_resume_token(document, sort))
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    return _chunked(lines(), cursor)
+
+EXPORT_FORMATS: Dict[str, Any] = {
+    "ndjson": (stream_ndjson, "application/x-ndjson"),
+    "csv": (stream_csv, "text/csv; charset=utf-8"),
+}
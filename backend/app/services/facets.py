@@ -0,0 +1,182 @@
+import asyncio
+import datetime
+import heapq
+import logging
+import time
+from typing import Any, Dict, List, Set
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import get_settings
+from app.services.mongo_services import (
+    PERIODS,
+    aggregate_video_facets,
+    build_video_filter,
+    get_video_rollup,
+    period_start,
+    rebuild_video_rollup,
+)
+from app.services.video_repository import video_repository
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+class VideoFacetService:
+    """
+    Facet counts of a game's stored videos for /api/videos/facets.
+
+    Counts are read from the game's rollup document, and the top users from
+    its per-user counts in `video_rollup_users`, both maintained
+    incrementally by the upsert path as videos are inserted. At most once per
+    `verify_interval` seconds per game, a read checks the rollup's
+    `doc_count` against a count of the game's videos on the `game_id`
+    index. When they differ, or the rollup was never built, the response is
+    computed with a `$facet` aggregation instead and the rollup is rebuilt in
+    the background, at most once per `rebuild_interval` seconds per game.
+
+    Updates that change a video's language or user name leave `doc_count`
+    as it is, so rollups not rebuilt for `max_age` seconds are rebuilt in
+    the background too, while still being served.
+
+    Day buckets only cover whole days, so each sliding period adds an
+    indexed count of the videos from its first, partial day, cached like
+    the other video counts.
+    """
+
+    def __init__(
+        self,
+        rebuild_interval: float = settings.facets_rollup_rebuild_interval,
+        verify_interval: float = settings.facets_rollup_verify_interval,
+        max_age: float = settings.facets_rollup_max_age,
+    ):
+        self.rebuild_interval = rebuild_interval
+        self.verify_interval = verify_interval
+        self.max_age = max_age
+        self._last_rebuild: Dict[str, float] = {}
+        self._last_verified: Dict[str, float] = {}
+        self._background: Set[asyncio.Task] = set()
+
+        self.rollup_reads = 0
+        self.verifications = 0
+        self.fallbacks = 0
+        self.rebuilds = 0
+        self.rebuild_skips = 0
+        self.rebuild_failures = 0
+
+    async def get_facets(self, game_id: str, top_users: int) -> Dict[str, Any]:
+        rollup = await run_in_threadpool(get_video_rollup, game_id, top_users)
+
+        if rollup is not None and await self._verify(game_id, rollup):
+            self.rollup_reads += 1
+            rebuilt_at = rollup["rebuilt_at"]
+            if rebuilt_at is None or (datetime.datetime.utcnow() - rebuilt_at).total_seconds() > self.max_age:
+                self._schedule_rebuild(game_id)
+            periods = await self._rollup_periods(game_id, rollup["days"])
+            return self._response(
+                game_id, "rollup", rollup["doc_count"], rollup["languages"], rollup["users"], periods, top_users
+            )
+
+        self.fallbacks += 1
+        if rollup is None:
+            logger.info("Rollup of game %s is missing, aggregating its facets", game_id)
+        self._schedule_rebuild(game_id)
+        facets = await run_in_threadpool(aggregate_video_facets, game_id, top_users)
+        return self._response(
+            game_id, "aggregation", facets["total"], facets["languages"], facets["users"], facets["periods"], top_users
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rollup_reads": self.rollup_reads,
+            "verifications": self.verifications,
+            "fallbacks": self.fallbacks,
+            "rebuilds": self.rebuilds,
+            "rebuild_skips": self.rebuild_skips,
+            "rebuild_failures": self.rebuild_failures,
+        }
+
+    async def _verify(self, game_id: str, rollup: Dict[str, Any]) -> bool:
+        now = time.monotonic()
+        last = self._last_verified.get(game_id)
+        if last is not None and now - last < self.verify_interval:
+            return True
+
+        self.verifications += 1
+        doc_count = await video_repository.count(build_video_filter(game_id=game_id))
+        if rollup["doc_count"] != doc_count:
+            self._last_verified.pop(game_id, None)
+            logger.info(
+                "Rollup of game %s counts %d of %d videos, aggregating its facets",
+                game_id, rollup["doc_count"], doc_count
+            )
+            return False
+        self._last_verified[game_id] = now
+        return True
+
+    @staticmethod
+    async def _rollup_periods(game_id: str, days: Dict[str, int]) -> Dict[str, int]:
+        now = datetime.datetime.utcnow()
+        first_days = {}
+        partial_counts = []
+        for period in PERIODS:
+            start = period_start(period, now)
+            first_days[period] = start[:10]
+            next_day = (datetime.date.fromisoformat(start[:10]) + datetime.timedelta(days=1)).isoformat()
+            partial_counts.append(
+                video_repository.count(
+                    {"game_id": game_id, "created_at": {"$gte": start, "$lt": next_day}},
+                    cache_key=("facets", game_id, period)
+                )
+            )
+        partials = await asyncio.gather(*partial_counts)
+        return {
+            period: partial + sum(count for day, count in days.items() if day > first_days[period])
+            for period, partial in zip(PERIODS, partials)
+        }
+
+    @staticmethod
+    def _response(
+        game_id: str,
+        source: str,
+        total: int,
+        languages: Dict[str, int],
+        users: Dict[str, int],
+        periods: Dict[str, int],
+        top_users: int,
+    ) -> Dict[str, Any]:
+        def ranked(counts: Dict[str, int], limit: int) -> List[Dict[str, Any]]:
+            top = heapq.nsmallest(limit, counts.items(), key=lambda item: (-item[1], item[0]))
+            return [{"value": value, "count": count} for value, count in top]
+
+        return {
+            "game_id": game_id,
+            "total": total,
+            "languages": ranked(languages, len(languages)),
+            "periods": {**periods, "all": total},
+            "top_users": ranked(users, top_users),
+            "source": source,
+        }
+
+    def _schedule_rebuild(self, game_id: str):
+        now = time.monotonic()
+        last = self._last_rebuild.get(game_id)
+        if last is not None and now - last < self.rebuild_interval:
+            return
+        self._last_rebuild[game_id] = now
+        task = asyncio.ensure_future(self._rebuild(game_id))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _rebuild(self, game_id: str):
+        try:
+            rollup = await run_in_threadpool(rebuild_video_rollup, game_id)
+            if rollup is None:
+                self.rebuild_skips += 1
+                logger.info("Rollup of game %s changed during its rebuild, kept it", game_id)
+                return
+            self.rebuilds += 1
+            logger.info("Rebuilt the rollup of game %s (%d videos)", game_id, rollup["doc_count"])
+        except Exception:
+            self.rebuild_failures += 1
+            logger.warning("Could not rebuild the rollup of game %s", game_id, exc_info=True)
+
+video_facet_service = VideoFacetService()
@@ -0,0 +1,228 @@
+import asyncio
+import bisect
+import heapq
+import logging
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import get_settings
+from app.services.mongo_services import (
+    get_games_updated_since,
+    increment_game_popularity,
+    save_games,
+)
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+def normalize_name(text: str) -> str:
+    """Lowercases, strips accents and collapses punctuation to single spaces."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _NON_WORD.sub(" ", stripped).strip()
+
+@dataclass
+class IndexedGame:
+    id: str
+    name: str
+    box_art_url: str
+    normalized: str
+    popularity: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"id": self.id, "name": self.name, "box_art_url": self.box_art_url}
+
+class GameIndex:
+    """
+    In-memory game catalogue serving /api/autocomplete.
+
+    Games are kept in two sorted lists, one of full normalized names and one
+    of name tokens, so a prefix lookup is a binary search followed by a short
+    scan. Matches are ranked by full-name prefix first, then popularity.
+
+    The index is loaded from the `games` collection and then kept up to date
+    by a background task that reloads games changed since the last sync and
+    pushes local popularity increments back to MongoDB.
+    """
+
+    def __init__(self, refresh_interval: float = settings.game_index_refresh_interval):
+        self.refresh_interval = refresh_interval
+        self._games: Dict[str, IndexedGame] = {}
+        self._names: List[Tuple[str, str]] = []
+        self._tokens: List[Tuple[str, str]] = []
+        self._popularity_increments: Counter = Counter()
+        self._high_water = None
+        self._task: Optional[asyncio.Task] = None
+        self._background: Set[asyncio.Task] = set()
+        self.loaded = False
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._games)
+
+    async def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.sync()
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Returns up to `limit` games whose name or name tokens start with the query."""
+        normalized = normalize_name(query)
+        if not normalized:
+            return []
+
+        name_matches = set(self._prefix_scan(self._names, normalized))
+
+        token_matches: Optional[Set[str]] = None
+        for token in normalized.split(" "):
+            matches = set(self._prefix_scan(self._tokens, token))
+            token_matches = matches if token_matches is None else token_matches & matches
+            if not token_matches:
+                break
+
+        candidates = name_matches | (token_matches or set())
+        if not candidates:
+            self.misses += 1
+            return []
+        self.hits += 1
+
+        best = heapq.nsmallest(
+            limit,
+            (self._games[game_id] for game_id in candidates),
+            key=lambda game: (game.id not in name_matches, -game.popularity, len(game.name))
+        )
+        return [game.to_dict() for game in best]
+
+    def add_games(self, games: List[Dict[str, Any]], popularity: Optional[Dict[str, int]] = None):
+        for game in games:
+            self._add(game, (popularity or {}).get(game["id"]))
+
+    async def feed(self, games: List[Dict[str, Any]]):
+        """Adds games fetched from Twitch to the index and saves them in the background."""
+        self.add_games(games)
+        task = asyncio.create_task(self._save(games))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def record_selection(self, game_id: str):
+        """Bumps the popularity of a game a user searched videos for."""
+        game = self._games.get(game_id)
+        if game is not None:
+            game.popularity += 1
+            self._popularity_increments[game_id] += 1
+
+    async def sync(self):
+        """Pushes local popularity increments, then reloads games changed since the last sync."""
+        increments, self._popularity_increments = self._popularity_increments, Counter()
+        try:
+            await run_in_threadpool(increment_game_popularity, dict(increments))
+        except Exception:
+            self._popularity_increments.update(increments)
+            logger.exception("Failed to save game popularity")
+
+        try:
+            games = await run_in_threadpool(get_games_updated_since, self._high_water)
+        except Exception:
+            logger.exception("Failed to reload the game index")
+            return
+
+        # Applied on the event loop, the only place the index is mutated.
+        # The first load appends every key and sorts once, an insort per key
+        # would be quadratic in the size of the catalog.
+        for game in games:
+            self._add(game, game.get("popularity", 0), index_keys=self.loaded)
+            if self._high_water is None or game["updated_at"] > self._high_water:
+                self._high_water = game["updated_at"]
+        if not self.loaded:
+            self._rebuild_keys()
+        self.loaded = True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "games": len(self._games),
+            "loaded": self.loaded,
+            "hits": self.hits,
+            "misses": self.misses,
+            "pending_popularity_updates": len(self._popularity_increments),
+        }
+
+    @staticmethod
+    def _prefix_scan(entries: List[Tuple[str, str]], prefix: str):
+        position = bisect.bisect_left(entries, (prefix, ""))
+        while position < len(entries) and entries[position][0].startswith(prefix):
+            yield entries[position][1]
+            position += 1
+
+    def _add(self, game: Dict[str, Any], popularity: Optional[int] = None, index_keys: bool = True):
+        """Adds or updates a game. Without `index_keys`, the key lists are left to `_rebuild_keys`."""
+        existing = self._games.get(game["id"])
+        normalized = normalize_name(game["name"])
+
+        if existing is not None and existing.normalized != normalized:
+            if index_keys:
+                self._remove_keys(existing)
+            existing = IndexedGame(game["id"], game["name"], "", normalized, existing.popularity)
+            if index_keys:
+                self._insert_keys(existing)
+        elif existing is None:
+            existing = IndexedGame(game["id"], game["name"], "", normalized)
+            if index_keys:
+                self._insert_keys(existing)
+
+        existing.name = game["name"]
+        existing.box_art_url = game.get("box_art_url", "")
+        if popularity is not None:
+            # Keep increments not yet pushed to MongoDB
+            existing.popularity = popularity + self._popularity_increments.get(game["id"], 0)
+        self._games[game["id"]] = existing
+
+    def _rebuild_keys(self):
+        self._names = sorted((game.normalized, game.id) for game in self._games.values())
+        self._tokens = sorted(
+            (token, game.id) for game in self._games.values() for token in set(game.normalized.split(" "))
+        )
+
+    def _insert_keys(self, game: IndexedGame):
+        bisect.insort(self._names, (game.normalized, game.id))
+        for token in set(game.normalized.split(" ")):
+            bisect.insort(self._tokens, (token, game.id))
+
+    def _remove_keys(self, game: IndexedGame):
+        self._discard(self._names, (game.normalized, game.id))
+        for token in set(game.normalized.split(" ")):
+            self._discard(self._tokens, (token, game.id))
+
+    @staticmethod
+    def _discard(entries: List[Tuple[str, str]], entry: Tuple[str, str]):
+        position = bisect.bisect_left(entries, entry)
+        if position < len(entries) and entries[position] == entry:
+            del entries[position]
+
+    async def _save(self, games: List[Dict[str, Any]]):
+        try:
+            await run_in_threadpool(save_games, games)
+        except Exception:
+            logger.exception("Failed to save %d games", len(games))
+
+    async def _run(self):
+        while True:
+            await self.sync()
+            await asyncio.sleep(self.refresh_interval)
+
+game_index = GameIndex()
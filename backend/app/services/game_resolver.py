@@ -0,0 +1,227 @@
+import asyncio
+import datetime
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from fastapi.concurrency import run_in_threadpool
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+from app.services.mongo_services import get_games_by_keys, name_key, save_games
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Helix accepts up to 100 `id` and `name` parameters per /games call
+HELIX_MAX_GAMES_PER_CALL = 100
+
+# ("id", "21779") or ("name", "league of legends")
+GameKey = Tuple[str, str]
+FetchGames = Callable[[List[str], List[str]], Awaitable[List[Dict[str, Any]]]]
+
+_MISSING = object()
+
+class GameResolver:
+    """
+    Local resolution of game names and IDs.
+
+    Lookups go through an in-process LRU, then the `games` collection, then
+    Helix `/games`. Misses arriving in the same event loop iteration are
+    gathered into one batch, sent to Helix 100 names or IDs per call, and
+    concurrent lookups of the same game share a single resolution. Games are
+    served from the cache or the database even when old; those last fetched
+    more than `refresh_after` seconds ago are refreshed in the background.
+    Unknown names are remembered for `negative_ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        fetch_games: FetchGames,
+        maxsize: int = settings.game_resolver_cache_size,
+        refresh_after: float = settings.game_resolver_refresh_after,
+        negative_ttl: float = settings.game_resolver_negative_ttl,
+    ):
+        self.fetch_games = fetch_games
+        self.refresh_after = datetime.timedelta(seconds=refresh_after)
+        self.negative_ttl = negative_ttl
+        self._cache = TTLCache(maxsize=maxsize, ttl=refresh_after)
+        self._in_flight: Dict[GameKey, asyncio.Future] = {}
+        self._batch: Dict[GameKey, asyncio.Future] = {}
+        self._flush_scheduled = False
+        self._refresh_queue: List[str] = []
+        self._refreshing: Set[str] = set()  # Queued or being refreshed
+        self._background: Set[asyncio.Task] = set()
+
+        self.coalesced = 0
+        self.db_hits = 0
+        self.helix_calls = 0
+        self.helix_games = 0
+        self.refreshes = 0
+
+    async def get_by_ids(self, game_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Returns the known games among `game_ids`, by ID."""
+        resolved = await self._resolve([("id", game_id) for game_id in game_ids])
+        return {key[1]: game for key, game in resolved.items() if game is not None}
+
+    async def get_by_names(self, names: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Returns the known games among `names` (case-insensitive), by requested name."""
+        names = list(names)
+        resolved = await self._resolve([("name", name_key(name)) for name in names])
+        games = {}
+        for name in names:
+            game = resolved.get(("name", name_key(name)))
+            if game is not None:
+                games[name] = game
+        return games
+
+    async def get_game_id(self, name: str) -> Optional[str]:
+        game = (await self.get_by_names([name])).get(name)
+        return game["id"] if game else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._cache),
+            "hits": self._cache.hits,
+            "misses": self._cache.misses,
+            "coalesced": self.coalesced,
+            "db_hits": self.db_hits,
+            "helix_calls": self.helix_calls,
+            "helix_games": self.helix_games,
+            "refreshes": self.refreshes,
+        }
+
+    async def _resolve(self, keys: List[GameKey]) -> Dict[GameKey, Optional[Dict[str, Any]]]:
+        resolved: Dict[GameKey, Optional[Dict[str, Any]]] = {}
+        waiting: Dict[GameKey, asyncio.Future] = {}
+        for key in dict.fromkeys(keys):
+            cached = self._cache.get(key, _MISSING)
+            if cached is not _MISSING:
+                resolved[key] = self._serve(cached)
+            elif key in self._in_flight:
+                self.coalesced += 1
+                waiting[key] = self._in_flight[key]
+            else:
+                waiting[key] = self._enqueue(key)
+
+        for key, future in waiting.items():
+            # Shielded, the batch is shared with other callers
+            resolved[key] = await asyncio.shield(future)
+        return resolved
+
+    def _serve(self, game: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if game is not None and self._is_stale(game):
+            self._refresh_in_background(game["id"])
+        return game
+
+    def _is_stale(self, game: Dict[str, Any]) -> bool:
+        updated_at = game.get("updated_at")
+        return updated_at is None or datetime.datetime.utcnow() - updated_at > self.refresh_after
+
+    def _enqueue(self, key: GameKey) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        self._batch[key] = future
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            self._spawn(self._flush())
+        return future
+
+    def _spawn(self, coroutine: Awaitable):
+        task = asyncio.ensure_future(coroutine)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def _remember(self, game: Dict[str, Any]):
+        self._cache.set(("id", game["id"]), game)
+        self._cache.set(("name", name_key(game["name"])), game)
+
+    async def _flush(self):
+        # Let the other lookups of this loop iteration join the batch
+        await asyncio.sleep(0)
+        batch, self._batch = self._batch, {}
+        self._flush_scheduled = False
+
+        try:
+            found = await self._load(list(batch))
+            for key, future in batch.items():
+                if not future.done():
+                    future.set_result(found.get(key))
+        except Exception as exc:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(exc)
+            # Retrieved here so an unobserved failure is not reported twice
+            for future in batch.values():
+                future.exception()
+        finally:
+            for key in batch:
+                self._in_flight.pop(key, None)
+
+    async def _load(self, keys: List[GameKey]) -> Dict[GameKey, Dict[str, Any]]:
+        ids = [value for kind, value in keys if kind == "id"]
+        names = [value for kind, value in keys if kind == "name"]
+        found: Dict[GameKey, Dict[str, Any]] = {}
+
+        for game in await run_in_threadpool(get_games_by_keys, ids, names):
+            self.db_hits += 1
+            self._remember(game)
+            found[("id", game["id"])] = game
+            found[("name", name_key(game["name"]))] = game
+            if self._is_stale(game):
+                self._refresh_in_background(game["id"])
+
+        missing_ids = [game_id for game_id in ids if ("id", game_id) not in found]
+        missing_names = [name for name in names if ("name", name) not in found]
+        if missing_ids or missing_names:
+            for game in await self._fetch(missing_ids, missing_names):
+                found[("id", game["id"])] = game
+                found[("name", name_key(game["name"]))] = game
+
+        for key in keys:
+            if key not in found:
+                self._cache.set(key, None, ttl=self.negative_ttl)
+        return found
+
+    async def _fetch(self, ids: List[str], names: List[str]) -> List[Dict[str, Any]]:
+        """Fetches games from Helix in calls of at most 100 IDs and names, then saves them."""
+        params = [("id", game_id) for game_id in ids] + [("name", name) for name in names]
+        chunks = [params[start:start + HELIX_MAX_GAMES_PER_CALL] for start in range(0, len(params), HELIX_MAX_GAMES_PER_CALL)]
+        pages = await asyncio.gather(*(
+            self.fetch_games(
+                [value for kind, value in chunk if kind == "id"],
+                [value for kind, value in chunk if kind == "name"]
+            )
+            for chunk in chunks
+        ))
+        self.helix_calls += len(chunks)
+
+        now = datetime.datetime.utcnow()
+        games = list({game["id"]: {**game, "updated_at": now} for page in pages for game in page}.values())
+        self.helix_games += len(games)
+        for game in games:
+            self._remember(game)
+        if games:
+            try:
+                await run_in_threadpool(save_games, games)
+            except Exception:
+                logger.exception("Failed to save %d resolved games", len(games))
+        return games
+
+    def _refresh_in_background(self, game_id: str):
+        if game_id in self._refreshing:
+            return
+        self._refreshing.add(game_id)
+        self._refresh_queue.append(game_id)
+        if len(self._refresh_queue) == 1:
+            self._spawn(self._refresh())
+
+    async def _refresh(self):
+        # Stale games found in the same loop iteration share Helix calls
+        await asyncio.sleep(0)
+        ids, self._refresh_queue = self._refresh_queue, []
+        try:
+            await self._fetch(ids, [])
+            self.refreshes += len(ids)
+        except Exception:
+            logger.warning("Background refresh of %d games failed", len(ids), exc_info=True)
+        finally:
+            self._refreshing.difference_update(ids)
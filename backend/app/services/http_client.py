@@ -0,0 +1,35 @@
+from typing import Optional
+import httpx
+from app.core.config import get_settings
+
+_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Returns the process-wide HTTP client used for Twitch calls.
+
+    The client keeps a keep-alive connection pool, so every TwitchService
+    instance reuses the same TCP/TLS connections instead of opening a new
+    one per request.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        settings = get_settings()
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.twitch_http_max_connections,
+                max_keepalive_connections=settings.twitch_http_max_keepalive_connections,
+                keepalive_expiry=settings.twitch_http_keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(
+                settings.twitch_http_timeout,
+                connect=settings.twitch_http_connect_timeout,
+            ),
+        )
+    return _client
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
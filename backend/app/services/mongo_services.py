@@ -1,137 +1,622 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Optional
 import datetime
-from pymongo.collection import Collection
-from pymongo.errors import PyMongoError
-from app.db.mongo import get_collection
+import hashlib
+import json
+import logging
+from pymongo import DeleteOne, UpdateOne
+from pymongo.cursor import Cursor
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
+from app.db.mongo import (
+    get_collection,
+    get_database,
+    get_game_collection,
+    get_ingest_state_collection,
+    get_token_collection,
+    get_video_rollup_collection,
+    get_video_rollup_user_collection,
+)
+from app.db.indexes import (
+    DEFAULT_KEYSET_SORT,
+    RELEVANCE_SORT,
+    TEXT_SCORE_PROJECTION,
+    VIDEO_SORTS,
+    ensure_game_indexes,
+    ensure_rollup_user_indexes,
+    ensure_video_indexes,
+    ensure_view_sample_collection,
+)
+from app.db.trending import trending_update_pipeline
+from app.db.pagination import decode_cursor, encode_cursor, seek_filter
 from app.models.models import Video
-from app.core.errors.exceptions import DatabaseException, ResourceNotFoundException
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+from app.core.metrics import timed_mongo
+from app.core.errors.exceptions import DatabaseException, ValidationException
 
-video_collection: Collection = get_collection() 
+logger = logging.getLogger(__name__)
 
+settings = get_settings()
+trending_window_hours = settings.trending_window_hours
+trending_min_interval_hours = settings.trending_min_sample_interval_minutes / 60
+# Internal bookkeeping fields are not part of the API documents
+VIDEO_PROJECTION = {"_id": 0, "last_sample_at": 0, "last_sample_views": 0, "content_hash": 0}
+# Version shared by every listing not filtered on a game
+ALL_GAMES_VERSION_KEY = "*"
+
+count_cache = TTLCache(maxsize=settings.videos_count_cache_size, ttl=settings.videos_count_cache_ttl)
+version_cache = TTLCache(maxsize=settings.videos_count_cache_size, ttl=settings.video_versions_cache_ttl)
+
+def content_hash(document: Dict[str, Any]) -> str:
+    """Short hash of the Helix fields of a video document, stored with it to derive ETags."""
+    encoded = json.dumps(document, sort_keys=True, separators=(",", ":"), default=str).encode()
+    return hashlib.blake2b(encoded, digest_size=12).hexdigest()
+
+@timed_mongo("create_indexes")
+def create_indexes():
+    try:
+        ensure_view_sample_collection(get_database(), settings.view_samples_retention_days)
+        return (
+            ensure_video_indexes(get_collection())
+            + ensure_game_indexes(get_game_collection())
+            + ensure_rollup_user_indexes(get_video_rollup_user_collection())
+        )
+    except PyMongoError as e:
+        raise DatabaseException(operation="create_indexes", detail=str(e))
+
+@timed_mongo("save_video")
 def save_video(video: Video):
     try:
         video_dict = video.dict()
-        video_collection.update_one({"id": video.id}, {"$set": video_dict}, upsert=True)
+        get_collection().update_one({"id": video.id}, {"$set": video_dict}, upsert=True)
     except PyMongoError as e:
         raise DatabaseException(operation="save", detail=str(e))
 
+@timed_mongo("get_videos")
 def get_videos():
     try:
-        videos = list(video_collection.find({}, {"_id": 0}))
+        videos = list(get_collection().find({}, VIDEO_PROJECTION))
         return videos
     except PyMongoError as e:
         raise DatabaseException(operation="find", detail=str(e))
 
-def save_multiple_videos(videos: List[Video]):
-    success_count = 0
-    error_count = 0
+def video_upsert_operations(documents: List[Dict[str, Any]], now: datetime.datetime) -> List[UpdateOne]:
+    """
+    One upsert per video document (see `helix_video_to_mongo`), storing the
+    `content_hash` of its Helix fields and refreshing its trending score.
+    """
+    return [
+        UpdateOne(
+            {"id": document["id"]},
+            trending_update_pipeline(
+                {**document, "content_hash": content_hash(document)},
+                now,
+                trending_window_hours,
+                trending_min_interval_hours
+            ),
+            upsert=True
+        )
+        for document in documents
+    ]
+
+def view_sample_documents(documents: List[Dict[str, Any]], ts: datetime.datetime) -> List[Dict[str, Any]]:
+    """One (video_id, ts, view_count) sample per video, for the view samples time series."""
+    return [
+        {"video_id": document["id"], "ts": ts, "view_count": document.get("view_count", 0)}
+        for document in documents
+    ]
+
+def version_bump_operations(keys: Iterable[str]) -> List[UpdateOne]:
+    """Increments the list version of each key (a game ID, or `ALL_GAMES_VERSION_KEY`)."""
+    return [
+        UpdateOne({"_id": key}, {"$inc": {"version": 1}, "$currentDate": {"updated_at": True}}, upsert=True)
+        for key in keys
+    ]
+
+# Facet fields kept in each game's rollup document: video field -> rollup field.
+# Counts by user name are unbounded, they are kept in `video_rollup_users`.
+ROLLUP_FIELDS = {"language": "languages"}
+
+def _rollup_key(value: str) -> str:
+    # Field names cannot contain dots nor start with a dollar sign
+    return value.replace("%", "%25").replace(".", "%2E").replace("$", "%24")
+
+def _rollup_value(key: str) -> str:
+    return key.replace("%24", "$").replace("%2E", ".").replace("%25", "%")
+
+def rollup_update_operations(documents: List[Dict[str, Any]]) -> List[UpdateOne]:
+    """
+    Adds newly inserted videos to the rollup document of their game: the
+    video count, and counts by language and creation day. Each update bumps
+    the rollup's `revision`, which guards rebuilds against lost increments.
+    """
+    increments: Dict[str, Dict[str, int]] = {}
+    for document in documents:
+        if not document.get("game_id"):
+            continue
+        fields = ["doc_count"]
+        for field, rollup_field in ROLLUP_FIELDS.items():
+            if document.get(field):
+                fields.append(f"{rollup_field}.{_rollup_key(document[field])}")
+        if document.get("created_at"):
+            fields.append(f"days.{document['created_at'][:10]}")
+        game_increments = increments.setdefault(document["game_id"], {"revision": 1})
+        for field in fields:
+            game_increments[field] = game_increments.get(field, 0) + 1
+
+    return [
+        UpdateOne({"_id": game_id}, {"$inc": fields, "$currentDate": {"updated_at": True}}, upsert=True)
+        for game_id, fields in increments.items()
+    ]
+
+def rollup_user_operations(documents: List[Dict[str, Any]]) -> List[UpdateOne]:
+    """Adds newly inserted videos to the per-user counts of their game, bumping each count's `revision`."""
+    increments: Dict[tuple, int] = {}
+    for document in documents:
+        if document.get("game_id") and document.get("user_name"):
+            key = (document["game_id"], document["user_name"])
+            increments[key] = increments.get(key, 0) + 1
+    return [
+        UpdateOne(
+            {"game_id": game_id, "user_name": user_name},
+            {"$inc": {"count": count, "revision": 1}},
+            upsert=True
+        )
+        for (game_id, user_name), count in increments.items()
+    ]
+
+@timed_mongo("get_video_rollup")
+def get_video_rollup(game_id: str, top_users: int) -> Optional[Dict[str, Any]]:
+    """
+    Returns the rollup of a game (`doc_count`, `languages`, `days`, the
+    `top_users` users with the most videos as `users`, and `rebuilt_at`,
+    None until its first rebuild), None if it was never built.
+    """
+    try:
+        rollup = get_video_rollup_collection().find_one({"_id": game_id}, {"users": 0})
+        if rollup is None:
+            return None
+        users = get_video_rollup_user_collection().find(
+            {"game_id": game_id, "count": {"$gt": 0}}, {"_id": 0, "user_name": 1, "count": 1}
+        ).sort("count", -1).limit(top_users)
+        users = {user["user_name"]: user["count"] for user in users}
+    except PyMongoError as e:
+        raise DatabaseException(operation="find_rollup", detail=str(e))
+    return {
+        "doc_count": rollup.get("doc_count", 0),
+        "days": rollup.get("days", {}),
+        "rebuilt_at": rollup.get("rebuilt_at"),
+        "users": users,
+        **{
+            rollup_field: {_rollup_value(key): count for key, count in rollup.get(rollup_field, {}).items()}
+            for rollup_field in ROLLUP_FIELDS.values()
+        },
+    }
+
+def _video_facet_stages(top_users: Optional[int]) -> Dict[str, List[Dict[str, Any]]]:
+    users = [{"$group": {"_id": "$user_name", "count": {"$sum": 1}}}, {"$sort": {"count": -1, "_id": 1}}]
+    if top_users is not None:
+        users.append({"$limit": top_users})
+    return {
+        "total": [{"$count": "count"}],
+        "languages": [{"$group": {"_id": "$language", "count": {"$sum": 1}}}],
+        "users": users,
+    }
+
+def _facet_counts(buckets: List[Dict[str, Any]]) -> Dict[str, int]:
+    return {bucket["_id"]: bucket["count"] for bucket in buckets if bucket["_id"]}
+
+@timed_mongo("aggregate_video_facets")
+def aggregate_video_facets(game_id: str, top_users: int) -> Dict[str, Any]:
+    """
+    Computes the facets of a game with a `$facet` aggregation over its videos,
+    for when its rollup is missing or out of date.
+    """
+    now = datetime.datetime.utcnow()
+    stages = _video_facet_stages(top_users)
+    for period in PERIODS:
+        stages[period] = [{"$match": {"created_at": {"$gte": period_start(period, now)}}}, {"$count": "count"}]
+    try:
+        result = next(get_collection().aggregate([{"$match": {"game_id": game_id}}, {"$facet": stages}]))
+    except PyMongoError as e:
+        raise DatabaseException(operation="aggregate_facets", detail=str(e))
+
+    def total(facet: str) -> int:
+        return result[facet][0]["count"] if result[facet] else 0
+
+    return {
+        "total": total("total"),
+        "languages": _facet_counts(result["languages"]),
+        "users": _facet_counts(result["users"]),
+        "periods": {period: total(period) for period in PERIODS},
+    }
+
+@timed_mongo("rebuild_video_rollup")
+def rebuild_video_rollup(game_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Recomputes the rollup of a game and its per-user counts from its videos.
+
+    Each document is only replaced if its `revision` did not change since
+    the rebuild read it, so increments from videos inserted meanwhile are
+    never overwritten; a rollup skipped that way stays as it is until the
+    next rebuild. Returns None when the rollup was skipped. Changes to the
+    facet fields of existing videos are only picked up by a rebuild.
+    """
+    rollups = get_video_rollup_collection()
+    user_counts = get_video_rollup_user_collection()
+    stages = _video_facet_stages(None)
+    stages["days"] = [{"$group": {"_id": {"$substrCP": ["$created_at", 0, 10]}, "count": {"$sum": 1}}}]
+    try:
+        previous = rollups.find_one({"_id": game_id}, {"revision": 1})
+        user_revisions = {
+            user["user_name"]: user.get("revision")
+            for user in user_counts.find({"game_id": game_id}, {"_id": 0, "user_name": 1, "revision": 1})
+        }
+        result = next(get_collection().aggregate([{"$match": {"game_id": game_id}}, {"$facet": stages}]))
+
+        operations = []
+        for user_name, count in _facet_counts(result["users"]).items():
+            user = {"game_id": game_id, "user_name": user_name}
+            if user_name in user_revisions:
+                user_filter = {**user, "revision": user_revisions.pop(user_name)}
+            else:
+                # Fails on the unique index if an increment created it meanwhile
+                user_filter = {**user, "revision": {"$exists": False}}
+            operations.append(UpdateOne(user_filter, {"$set": {"count": count}}, upsert=True))
+        for user_name, revision in user_revisions.items():
+            operations.append(DeleteOne({"game_id": game_id, "user_name": user_name, "revision": revision}))
+        if operations:
+            try:
+                user_counts.bulk_write(operations, ordered=False)
+            except BulkWriteError:
+                pass  # Users counted meanwhile keep their increments
+
+        rebuilt_at = datetime.datetime.utcnow()
+        rollup = {
+            "doc_count": result["total"][0]["count"] if result["total"] else 0,
+            "languages": {_rollup_key(key): count for key, count in _facet_counts(result["languages"]).items()},
+            "days": _facet_counts(result["days"]),
+            "revision": previous.get("revision", 0) if previous else 0,
+            "updated_at": rebuilt_at,
+            "rebuilt_at": rebuilt_at,
+        }
+        if previous is None:
+            try:
+                rollups.insert_one({"_id": game_id, **rollup})
+            except DuplicateKeyError:
+                return None
+        elif not rollups.replace_one({"_id": game_id, "revision": previous.get("revision")}, rollup).matched_count:
+            return None
+    except PyMongoError as e:
+        raise DatabaseException(operation="rebuild_rollup", detail=str(e))
+    return rollup
+
+# Sliding windows of the `period` filter
+PERIODS = {
+    "day": datetime.timedelta(days=1),
+    "week": datetime.timedelta(weeks=1),
+    "month": datetime.timedelta(days=30),
+}
+
+def period_start(period: Optional[str], now: Optional[datetime.datetime] = None) -> Optional[str]:
+    """Lower bound of `created_at` for a period, None for 'all' or no period."""
+    if period not in PERIODS:
+        return None
+    date_limit = (now or datetime.datetime.utcnow()) - PERIODS[period]
+    return date_limit.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def build_video_filter(
+    game_id: Optional[str] = None,
+    language: Optional[str] = None,
+    period: Optional[str] = None,
+    q: Optional[str] = None
+) -> Dict[str, Any]:
+    """Builds the MongoDB filter shared by the video listing and export queries."""
+    filter_query: Dict[str, Any] = {}
     
-    for i, video in enumerate(videos):
-        clean_data = video.to_mongo_dict()
-        
-        if "thumbnail_url" in clean_data and "%{" in clean_data["thumbnail_url"]:
-            clean_data["thumbnail_url"] = clean_data["thumbnail_url"].replace("%{width}", "1920").replace("%{height}", "1080")
-        
-        try:
-            print(f"Inserting video {i+1}/{len(videos)} with ID {video.id}")
-            video_collection.update_one(
-                {"id": video.id},
-                {"$set": clean_data},
-                upsert=True
-            )
-            success_count += 1
-            print(f"Video {i+1} inserted successfully")
-        except PyMongoError as e:
-            error_count += 1
-            print(f"Error inserting video {i+1}: {str(e)}")
+    if game_id:
+        filter_query["game_id"] = game_id
     
-    print(f"Bulk insertion completed: {success_count} success, {error_count} errors")
-    if error_count > 0 and success_count == 0:
-        raise DatabaseException(operation="batch_insert", detail=f"All {error_count} insertions failed")
+    if language:
+        filter_query["language"] = language
     
-    return {
-        "success_count": success_count,
-        "error_count": error_count
-    }
+    date_limit = period_start(period)
+    if date_limit:
+        filter_query["created_at"] = {"$gte": date_limit}
+    
+    if q:
+        filter_query["$text"] = {"$search": q}
+    
+    return filter_query
+
+def seek_video_filter(filter_query: Dict[str, Any], sort_options, values: List[Any]) -> Dict[str, Any]:
+    # $text may only appear once, at the top level of the query
+    filter_query = dict(filter_query)
+    text_search = filter_query.pop("$text", None)
+    filter_query = seek_filter(filter_query, sort_options, values)
+    if text_search:
+        filter_query["$text"] = text_search
+    return filter_query
 
-def get_videos_from_db(
-    video_id: Optional[str] = None,
+def plan_video_query(
     game_id: Optional[str] = None,
     language: Optional[str] = None,
     sort: Optional[str] = None,
     period: Optional[str] = None,
-    skip: int = 0,
-    limit: int = 50
+    cursor: Optional[str] = None,
+    q: Optional[str] = None
 ) -> Dict[str, Any]:
     """
-    Retrieves videos from the database with optional filters.
+    Builds the query of a /api/videos page.
     
     Args:
-        video_id: Specific video ID to retrieve
         game_id: Filter by game ID
         language: Filter by language (e.g. 'en', 'fr')
-        sort: Sort by 'time', 'trending' or 'views'
+        sort: Sort by 'time' (default), 'trending' or 'views'
         period: Filter by 'day', 'week', 'month', or 'all'
-        skip: Number of videos to skip (for pagination)
-        limit: Maximum number of videos to return
+        cursor: Continuation token from a previous page; when given, the
+            page starts right after the token
+        q: Full-text search over title and description; without `sort`,
+            results are ranked by relevance and paginated with `skip` only
         
     Returns:
-        Dictionary containing videos and total count
+        Dictionary with the `count_filter` of the total, the page `filter`,
+        `projection` and `sort`, and the `keyset_sort` continuation tokens
+        are encoded with (None for relevance order)
+    """
+    count_filter = build_video_filter(game_id, language, period, q)
+    projection = dict(VIDEO_PROJECTION)
+    
+    if q and sort not in VIDEO_SORTS:
+        # Relevance order has no seekable key, only offset pagination
+        if cursor:
+            raise ValidationException("Le cursor n'est pas disponible pour un tri par pertinence")
+        keyset_sort = None
+        sort_options = RELEVANCE_SORT
+        projection.update(TEXT_SCORE_PROJECTION)
+    else:
+        # Every other listing uses a total order so any page can hand out a continuation token
+        keyset_sort = sort if sort in VIDEO_SORTS else DEFAULT_KEYSET_SORT
+        sort_options = VIDEO_SORTS[keyset_sort]
+    
+    filter_query = count_filter
+    if cursor:
+        filter_query = seek_video_filter(count_filter, sort_options, decode_cursor(cursor, keyset_sort, sort_options))
+    
+    return {
+        "count_filter": count_filter,
+        "filter": filter_query,
+        "projection": projection,
+        "sort": sort_options,
+        "keyset_sort": keyset_sort,
+    }
+
+# Columns of the export, in CSV order
+EXPORT_FIELDS = [
+    "id", "game_id", "user_id", "user_login", "user_name", "title", "description",
+    "created_at", "published_at", "url", "thumbnail_url", "viewable", "view_count",
+    "language", "type", "duration", "trending_score",
+]
+
+def _export_sort(sort: Optional[str]):
+    keyset_sort = sort if sort in VIDEO_SORTS else DEFAULT_KEYSET_SORT
+    return keyset_sort, VIDEO_SORTS[keyset_sort]
+
+@timed_mongo("open_export_cursor")
+def open_export_cursor(
+    game_id: Optional[str] = None,
+    language: Optional[str] = None,
+    sort: Optional[str] = None,
+    period: Optional[str] = None,
+    q: Optional[str] = None,
+    cursor: Optional[str] = None
+) -> Cursor:
+    """
+    Opens a cursor over every video matching the /api/videos filters, in
+    keyset order, fetching `export_batch_size` documents per round-trip.
+
+    `cursor` is the resume token of the last video a client received (see
+    `with_resume_token`): the export then restarts right after it, so an
+    interrupted download can be resumed without re-reading what was already
+    sent. The token holds that video's sort values as they were sent, so
+    views and trending changing since do not skip or repeat videos.
     """
     try:
-        filter_query = {}
-        
-        if video_id:
-            result = video_collection.find_one({"id": video_id}, {"_id": 0})
-            if not result:
-                raise ResourceNotFoundException("Video", video_id)
-            return result
-        
-        if game_id:
-            filter_query["game_id"] = game_id
-        
-        if language:
-            filter_query["language"] = language
-        
-        if period:
-            now = datetime.datetime.utcnow()
-            if period == "day":
-                date_limit = now - datetime.timedelta(days=1)
-            elif period == "week":
-                date_limit = now - datetime.timedelta(weeks=1)
-            elif period == "month":
-                date_limit = now - datetime.timedelta(days=30)
-            else:
-                date_limit = None
-                
-            if date_limit:
-                date_str = date_limit.strftime("%Y-%m-%dT%H:%M:%SZ")
-                filter_query["created_at"] = {"$gte": date_str}
-        
-        sort_options = []
-        if sort == "time":
-            sort_options = [("created_at", -1)]
-        elif sort == "views":
-            sort_options = [("view_count", -1)]
-        elif sort == "trending":
-            sort_options = [("view_count", -1), ("created_at", -1)]
-        
-        total_count = video_collection.count_documents(filter_query)
-        
-        cursor = video_collection.find(filter_query, {"_id": 0})
+        filter_query = build_video_filter(game_id, language, period, q)
+        keyset_sort, sort_options = _export_sort(sort)
         
-        if sort_options:
-            cursor = cursor.sort(sort_options)
+        if cursor:
+            values = decode_cursor(cursor, keyset_sort, sort_options)
+            filter_query = seek_video_filter(filter_query, sort_options, values)
         
-        videos = list(cursor.skip(skip).limit(limit))
-        
-        return {
-            "videos": videos,
-            "total_count": total_count
-        }
-    except ResourceNotFoundException:
-        raise
+        projection = {"_id": 0, **{field: 1 for field in EXPORT_FIELDS}, **{field: 1 for field, _ in sort_options}}
+        return get_collection().find(
+            filter_query, projection, batch_size=settings.export_batch_size
+        ).sort(sort_options)
+    except PyMongoError as e:
+        raise DatabaseException(operation="export", detail=str(e))
+
+def with_resume_token(document: Dict[str, Any], sort: Optional[str] = None) -> Dict[str, Any]:
+    """Adds the `cursor` resuming an export after this video, and drops the sort keys that are not exported."""
+    keyset_sort, sort_options = _export_sort(sort)
+    document["cursor"] = encode_cursor(keyset_sort, document, sort_options)
+    for field, _ in sort_options:
+        if field not in EXPORT_FIELDS:
+            document.pop(field, None)
+    return document
+
+def name_key(name: str) -> str:
+    """Case-insensitive lookup key of a game name, as Helix matches names."""
+    return name.strip().casefold()
+
+@timed_mongo("save_games")
+def save_games(games: List[Dict[str, Any]]):
+    """
+    Upserts games seen on Twitch into the games collection.
+
+    `updated_at` is set by the server so that every worker can reload the
+    changes incrementally; `popularity` starts at 0 for new games.
+    """
+    if not games:
+        return
+    operations = [
+        UpdateOne(
+            {"id": game["id"]},
+            {
+                "$set": {
+                    "name": game["name"],
+                    "name_key": name_key(game["name"]),
+                    "box_art_url": game.get("box_art_url", ""),
+                },
+                "$setOnInsert": {"popularity": 0},
+                "$currentDate": {"updated_at": True},
+            },
+            upsert=True
+        )
+        for game in games
+    ]
+    try:
+        get_game_collection().bulk_write(operations, ordered=False)
+    except PyMongoError as e:
+        raise DatabaseException(operation="save_games", detail=str(e))
+
+@timed_mongo("get_games_by_keys")
+def get_games_by_keys(game_ids: List[str], name_keys: List[str]) -> List[Dict[str, Any]]:
+    """Returns the stored games matching any of `game_ids` or `name_keys` (see `name_key`)."""
+    conditions = []
+    if game_ids:
+        conditions.append({"id": {"$in": game_ids}})
+    if name_keys:
+        conditions.append({"name_key": {"$in": name_keys}})
+    if not conditions:
+        return []
+    try:
+        return list(get_game_collection().find(
+            {"$or": conditions},
+            {"_id": 0, "id": 1, "name": 1, "box_art_url": 1, "updated_at": 1}
+        ))
+    except PyMongoError as e:
+        raise DatabaseException(operation="find_games", detail=str(e))
+
+@timed_mongo("increment_game_popularity")
+def increment_game_popularity(counts: Dict[str, int]):
+    if not counts:
+        return
+    operations = [
+        UpdateOne({"id": game_id}, {"$inc": {"popularity": count}, "$currentDate": {"updated_at": True}})
+        for game_id, count in counts.items()
+    ]
+    try:
+        get_game_collection().bulk_write(operations, ordered=False)
+    except PyMongoError as e:
+        raise DatabaseException(operation="update_games", detail=str(e))
+
+@timed_mongo("get_games_updated_since")
+def get_games_updated_since(since: Optional[datetime.datetime] = None) -> List[Dict[str, Any]]:
+    try:
+        filter_query = {"updated_at": {"$gte": since}} if since else {}
+        return list(get_game_collection().find(filter_query, {"_id": 0}))
+    except PyMongoError as e:
+        raise DatabaseException(operation="find_games", detail=str(e))
+
+
+@timed_mongo("load_shared_token")
+def load_shared_token(key: str) -> Optional[Dict[str, Any]]:
+    """Returns the shared token stored under `key` (access_token, expires_at) if any."""
+    try:
+        return get_token_collection().find_one({"_id": key}, {"_id": 0, "access_token": 1, "expires_at": 1})
+    except PyMongoError as e:
+        raise DatabaseException(operation="find_token", detail=str(e))
+
+@timed_mongo("save_shared_token")
+def save_shared_token(key: str, access_token: str, expires_at: datetime.datetime):
+    try:
+        get_token_collection().update_one(
+            {"_id": key},
+            {"$set": {"access_token": access_token, "expires_at": expires_at}},
+            upsert=True
+        )
+    except PyMongoError as e:
+        raise DatabaseException(operation="save_token", detail=str(e))
+
+@timed_mongo("delete_shared_token")
+def delete_shared_token(key: str, access_token: str):
+    """Removes the shared token, unless another worker already replaced it."""
+    try:
+        get_token_collection().delete_one({"_id": key, "access_token": access_token})
+    except PyMongoError as e:
+        raise DatabaseException(operation="delete_token", detail=str(e))
+
+@timed_mongo("acquire_token_lease")
+def acquire_token_lease(key: str, holder: str, seconds: float) -> bool:
+    """
+    Takes the refresh lease for `key` if nobody holds it or if it expired.
+
+    Only the lease holder fetches a new token, the other workers wait for it
+    to show up in the shared store.
+    """
+    now = datetime.datetime.utcnow()
+    try:
+        get_token_collection().update_one(
+            {"_id": f"{key}:lease", "expires_at": {"$lt": now}},
+            {"$set": {"holder": holder, "expires_at": now + datetime.timedelta(seconds=seconds)}},
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        # The lease document exists and has not expired
+        return False
+    except PyMongoError as e:
+        raise DatabaseException(operation="acquire_lease", detail=str(e))
+
+@timed_mongo("release_token_lease")
+def release_token_lease(key: str, holder: str):
+    try:
+        get_token_collection().delete_one({"_id": f"{key}:lease", "holder": holder})
+    except PyMongoError as e:
+        raise DatabaseException(operation="release_lease", detail=str(e))
+
+
+@timed_mongo("get_ingest_state")
+def get_ingest_state(game_id: str) -> Dict[str, Any]:
+    """
+    Returns the ingestion state of a game: `high_water`, the `created_at` of
+    the newest video ingested by a complete crawl, and for a crawl stopped
+    before reaching it, the Helix cursor to resume from (`resume_cursor`)
+    and the newest video it ingested (`resume_high_water`).
+    """
+    try:
+        state = get_ingest_state_collection().find_one(
+            {"_id": game_id}, {"_id": 0, "high_water": 1, "resume_cursor": 1, "resume_high_water": 1}
+        )
+        return state or {}
+    except PyMongoError as e:
+        raise DatabaseException(operation="find_ingest_state", detail=str(e))
+
+@timed_mongo("set_ingest_high_water")
+def set_ingest_high_water(game_id: str, created_at: Optional[str]):
+    """Records a complete crawl: moves the high-water mark up to `created_at` and drops any resume position."""
+    update: Dict[str, Any] = {
+        "$unset": {"resume_cursor": "", "resume_high_water": ""},
+        "$currentDate": {"last_run_at": True},
+    }
+    if created_at is not None:
+        update["$max"] = {"high_water": created_at}
+    try:
+        get_ingest_state_collection().update_one({"_id": game_id}, update, upsert=True)
+    except PyMongoError as e:
+        raise DatabaseException(operation="save_ingest_state", detail=str(e))
+
+@timed_mongo("set_ingest_resume")
+def set_ingest_resume(game_id: str, cursor: Optional[str], newest: Optional[str]):
+    """Records a crawl stopped before the high-water mark, which leaves the mark unchanged. A None cursor restarts the next crawl from the newest video."""
+    try:
+        get_ingest_state_collection().update_one(
+            {"_id": game_id},
+            {
+                "$set": {"resume_cursor": cursor, "resume_high_water": newest},
+                "$currentDate": {"last_run_at": True},
+            },
+            upsert=True
+        )
     except PyMongoError as e:
-        raise DatabaseException(operation="query", detail=str(e))
-    except Exception as e:
-        raise DatabaseException(operation="query", detail="Unexpected error occurred")
\ No newline at end of file
+        raise DatabaseException(operation="save_ingest_state", detail=str(e))
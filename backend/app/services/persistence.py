@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Any
+from app.core.config import get_settings
+from app.services.video_repository import video_repository
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+class VideoPersistenceQueue:
+    """
+    Write-behind stage between the API and MongoDB.
+
+    Videos are pushed into a bounded in-process queue and a single consumer
+    task upserts them in batches. Several writes for the same video `id`
+    waiting in the same batch are coalesced into the latest one. A batch is
+    flushed when it reaches `batch_size` videos or when its oldest video has
+    waited `flush_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = settings.persistence_queue_maxsize,
+        batch_size: int = settings.persistence_batch_size,
+        flush_interval: float = settings.persistence_flush_interval,
+        enqueue_timeout: float = settings.persistence_enqueue_timeout,
+    ):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._first_pending_at: Optional[float] = None
+        self._closed = False
+
+        self.enqueued = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.blocked_puts = 0
+        self.put_wait_seconds = 0.0
+        self.max_queue_depth = 0
+        self.flushed = 0
+        self.flush_count = 0
+        self.flush_errors = 0
+        self.last_flush_seconds = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        if self.running:
+            return
+        self._closed = False
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def enqueue(self, videos: List[Dict[str, Any]], wait: bool = False) -> int:
+        """
+        Queues video documents (see `helix_video_to_mongo`) for persistence and returns how many were accepted.
+
+        Videos that do not fit in a full queue are dropped, so a request
+        saving what it fetched never waits on MongoDB. With `wait`, meant
+        for background callers, each video waits up to `enqueue_timeout`
+        seconds for room instead. After `drain`, videos are dropped until
+        the queue is started again.
+        """
+        if self._closed:
+            self.dropped += len(videos)
+            logger.warning("Persistence queue closed, dropped %d videos", len(videos))
+            return 0
+        if not self.running:
+            await self.start()
+
+        accepted = 0
+        for video in videos:
+            try:
+                self._queue.put_nowait(video)
+            except asyncio.QueueFull:
+                if not wait:
+                    self.dropped += len(videos) - accepted
+                    logger.warning("Persistence queue full, dropped %d videos", len(videos) - accepted)
+                    break
+                self.blocked_puts += 1
+                started = time.perf_counter()
+                try:
+                    await asyncio.wait_for(self._queue.put(video), self.enqueue_timeout)
+                except asyncio.TimeoutError:
+                    self.dropped += len(videos) - accepted
+                    logger.warning("Persistence queue full, dropped %d videos", len(videos) - accepted)
+                    break
+                finally:
+                    self.put_wait_seconds += time.perf_counter() - started
+            accepted += 1
+
+        self.enqueued += accepted
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return accepted
+
+    async def drain(self, timeout: float = settings.persistence_drain_timeout):
+        """Flushes everything still queued and stops the consumer; later videos are dropped."""
+        self._closed = True
+        if not self.running:
+            return
+        self._stopping.set()
+        try:
+            self._queue.put_nowait(None)  # Wake the consumer up if it is idle
+        except asyncio.QueueFull:
+            pass
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+            logger.error(
+                "Persistence queue drain timed out, %d videos not saved",
+                self._queue.qsize() + len(self._pending)
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "queue_maxsize": self.maxsize,
+            "max_queue_depth": self.max_queue_depth,
+            "pending": len(self._pending),
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "blocked_puts": self.blocked_puts,
+            "put_wait_seconds": round(self.put_wait_seconds, 6),
+            "flushed": self.flushed,
+            "flush_count": self.flush_count,
+            "flush_errors": self.flush_errors,
+            "last_flush_seconds": round(self.last_flush_seconds, 6),
+        }
+
+    def _add_pending(self, video: Dict[str, Any]):
+        if video["id"] in self._pending:
+            self.coalesced += 1
+        elif not self._pending:
+            self._first_pending_at = time.monotonic()
+        self._pending[video["id"]] = video
+
+    async def _run(self):
+        while True:
+            timeout = None
+            if self._pending:
+                timeout = max(0.0, self._first_pending_at + self.flush_interval - time.monotonic())
+
+            try:
+                video = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                await self._flush()
+                continue
+
+            if video is not None:
+                self._add_pending(video)
+            while len(self._pending) < self.batch_size and not self._queue.empty():
+                video = self._queue.get_nowait()
+                if video is not None:
+                    self._add_pending(video)
+
+            if self._stopping.is_set() and self._queue.empty():
+                await self._flush()
+                return
+
+            if (
+                len(self._pending) >= self.batch_size
+                or time.monotonic() - self._first_pending_at >= self.flush_interval
+            ):
+                await self._flush()
+
+    async def _flush(self):
+        if not self._pending:
+            return
+        batch = list(self._pending.values())
+        self._pending = {}
+        self._first_pending_at = None
+
+        started = time.perf_counter()
+        try:
+            result = await video_repository.upsert(batch)
+            self.flushed += result["success_count"]
+            self.flush_errors += result["error_count"]
+        except Exception:
+            self.flush_errors += len(batch)
+            logger.exception("Failed to persist a batch of %d videos", len(batch))
+        self.flush_count += 1
+        self.last_flush_seconds = time.perf_counter() - started
+
+video_persistence_queue = VideoPersistenceQueue()
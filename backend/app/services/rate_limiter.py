@@ -0,0 +1,199 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from app.core.config import get_settings
+from app.core.errors.exceptions import ExternalServiceException
+
+settings = get_settings()
+
+# Largest share of the bucket kept for interactive calls
+MAX_RESERVE_SHARE = 0.5
+
+class Priority(IntEnum):
+    INTERACTIVE = 0  # User-facing calls (autocomplete, search)
+    BACKGROUND = 1  # Crawling, refreshes
+
+class HelixRateLimiter:
+    """
+    Central scheduler for Helix calls, driven by the server-reported bucket.
+
+    Every call takes a slot before it is sent. A slot is granted while the
+    last known `Ratelimit-Remaining`, minus the calls already in flight,
+    stays positive. Background calls must also leave `interactive_reserve`
+    points untouched, at most half of the bucket, so they are delayed before
+    the bucket empties; until its size is known they are not. Waiting
+    calls are served by priority, then in arrival order, and are woken up when
+    a response refreshes the bucket or when it resets. A call that waits
+    longer than its priority's maximum wait is shed.
+    """
+
+    def __init__(
+        self,
+        interactive_reserve: int = settings.twitch_rate_limit_interactive_reserve,
+        max_wait_interactive: float = settings.twitch_rate_limit_max_wait_interactive,
+        max_wait_background: float = settings.twitch_rate_limit_max_wait_background,
+    ):
+        self.interactive_reserve = interactive_reserve
+        self.max_wait = {
+            Priority.INTERACTIVE: max_wait_interactive,
+            Priority.BACKGROUND: max_wait_background,
+        }
+
+        # Unknown until the first response
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset_at: float = 0.0
+        self.in_flight = 0
+
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        self.granted = {priority: 0 for priority in Priority}
+        self.shed = {priority: 0 for priority in Priority}
+        self.wait_seconds = {priority: 0.0 for priority in Priority}
+        self.max_wait_seconds = {priority: 0.0 for priority in Priority}
+        self.throttled_responses = 0
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority = Priority.INTERACTIVE):
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, priority: Priority = Priority.INTERACTIVE):
+        started = time.monotonic()
+        if not self._waiters and self._has_budget(priority):
+            self._grant(priority)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (int(priority), next(self._sequence), future)
+        heapq.heappush(self._waiters, entry)
+        self._pump()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.max_wait[priority])
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # Granted right as the wait timed out, give the slot back
+                self.release()
+            future.cancel()
+            self.shed[priority] += 1
+            raise ExternalServiceException("Twitch API", "Rate limit budget exhausted, request shed")
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            future.cancel()
+            raise
+        self._record_wait(priority, time.monotonic() - started)
+
+    def release(self):
+        self.in_flight -= 1
+        self._pump()
+
+    def update(self, headers: Mapping[str, str], status_code: int = 200):
+        """Refreshes the bucket from the `Ratelimit-*` headers of a Helix response."""
+        try:
+            if "Ratelimit-Limit" in headers:
+                self.limit = int(headers["Ratelimit-Limit"])
+            if "Ratelimit-Remaining" in headers:
+                self.remaining = int(headers["Ratelimit-Remaining"])
+            if "Ratelimit-Reset" in headers:
+                self.reset_at = float(headers["Ratelimit-Reset"])
+        except ValueError:
+            return
+        if status_code == 429:
+            self.throttled_responses += 1
+            self.remaining = 0
+        self._pump()
+
+    def queue_depth(self) -> Dict[Priority, int]:
+        depth = {priority: 0 for priority in Priority}
+        for priority, _, future in self._waiters:
+            if not future.done():
+                depth[Priority(priority)] += 1
+        return depth
+
+    def stats(self) -> Dict[str, Any]:
+        depth = self.queue_depth()
+        return {
+            "limit": self.limit,
+            "remaining": self.remaining,
+            "reset_in": round(max(0.0, self.reset_at - time.time()), 3) if self.reset_at else None,
+            "in_flight": self.in_flight,
+            "interactive_reserve": self.reserve(),
+            "throttled_responses": self.throttled_responses,
+            **{
+                priority.name.lower(): {
+                    "queue_depth": depth[priority],
+                    "granted": self.granted[priority],
+                    "shed": self.shed[priority],
+                    "wait_seconds": round(self.wait_seconds[priority], 6),
+                    "max_wait_seconds": round(self.max_wait_seconds[priority], 6),
+                }
+                for priority in Priority
+            },
+        }
+
+    def _has_budget(self, priority: Priority) -> bool:
+        if self.remaining is None:
+            return True
+        remaining = self.remaining
+        if time.time() >= self.reset_at:
+            # The bucket has been refilled since the last response; without a
+            # known size, let a single call through to learn it
+            remaining = self.limit if self.limit is not None else 1
+        budget = remaining - self.in_flight
+        if priority == Priority.BACKGROUND:
+            budget -= self.reserve()
+        return budget > 0
+
+    def reserve(self) -> int:
+        """Points background calls leave to interactive ones, none while the bucket size is unknown."""
+        if self.limit is None:
+            return 0
+        # A bucket at or below the configured reserve would starve background calls
+        return min(self.interactive_reserve, int(self.limit * MAX_RESERVE_SHARE))
+
+    def _grant(self, priority: Priority):
+        self.in_flight += 1
+        self.granted[priority] += 1
+
+    def _record_wait(self, priority: Priority, waited: float):
+        self.wait_seconds[priority] += waited
+        self.max_wait_seconds[priority] = max(self.max_wait_seconds[priority], waited)
+
+    def _pump(self):
+        while self._waiters:
+            priority, _, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if not self._has_budget(Priority(priority)):
+                break
+            heapq.heappop(self._waiters)
+            self._grant(Priority(priority))
+            future.set_result(None)
+        self._schedule_reset_wakeup()
+
+    def _schedule_reset_wakeup(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        delay = self.reset_at - time.time()
+        if not self._waiters or delay <= 0:
+            # Past the reset, the next release or response wakes the waiters up
+            return
+        self._timer = asyncio.get_running_loop().call_later(delay + 0.05, self._on_reset)
+
+    def _on_reset(self):
+        self._timer = None
+        self._pump()
+
+helix_rate_limiter = HelixRateLimiter()
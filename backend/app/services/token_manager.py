@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Optional, Set
+import httpx
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import get_settings
+from app.core.errors.exceptions import ExternalServiceException
+from app.core.metrics import twitch_request_duration
+from app.core.tracing import span
+from app.services.http_client import get_http_client
+from app.services.mongo_services import (
+    acquire_token_lease,
+    delete_shared_token,
+    load_shared_token,
+    release_token_lease,
+    save_shared_token,
+)
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Polling step while another worker holds the refresh lease
+_SHARED_POLL_INTERVAL = 0.25
+
+class TwitchTokenManager:
+    """
+    Process-wide holder of the Twitch app access token.
+
+    - Only one refresh runs at a time; concurrent callers wait for it.
+    - Once the token is within `refresh_margin` seconds of its expiry, it is
+      still served while a background refresh replaces it.
+    - The token is shared through MongoDB: a worker first looks for a valid
+      token in the store, and only the worker holding the refresh lease asks
+      Twitch for a new one while the others wait for it to be published.
+      If the store is unavailable, the manager fetches its own token.
+    """
+
+    def __init__(
+        self,
+        client_id: str = settings.twitch_client_id,
+        client_secret: str = settings.twitch_client_secret,
+        token_url: str = settings.twitch_token_url,
+        refresh_margin: float = settings.twitch_token_refresh_margin,
+        lease_seconds: float = settings.twitch_token_lease_seconds,
+        shared_wait: float = settings.twitch_token_shared_wait,
+    ):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.token_url = token_url
+        self.refresh_margin = timedelta(seconds=refresh_margin)
+        self.lease_seconds = lease_seconds
+        self.shared_wait = shared_wait
+        self.store_key = f"twitch_app_token:{client_id}"
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        self._access_token: Optional[str] = None
+        self._expires_at: Optional[datetime] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._background: Set[asyncio.Task] = set()
+
+        self.fetches = 0
+        self.shared_loads = 0
+        self.invalidations = 0
+
+    async def get_token(self) -> str:
+        now = datetime.now(timezone.utc)
+        if self._access_token and now < self._expires_at:
+            if now >= self._expires_at - self.refresh_margin:
+                self._refresh_in_background()
+            return self._access_token
+
+        async with self._get_lock():
+            # Another caller may have refreshed while we were waiting
+            if not (self._access_token and datetime.now(timezone.utc) < self._expires_at):
+                await self._refresh()
+        return self._access_token
+
+    async def invalidate(self, access_token: str):
+        """Drops a token Twitch rejected, here and in the shared store."""
+        if access_token != self._access_token:
+            return
+        self.invalidations += 1
+        self._access_token = None
+        self._expires_at = None
+        try:
+            await run_in_threadpool(delete_shared_token, self.store_key, access_token)
+        except Exception:
+            logger.warning("Could not remove the rejected token from the shared store", exc_info=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "fetches": self.fetches,
+            "shared_loads": self.shared_loads,
+            "invalidations": self.invalidations,
+            "expires_at": self._expires_at.isoformat() if self._expires_at else None,
+        }
+
+    def _get_lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def _refresh_in_background(self):
+        if self._get_lock().locked():
+            return
+        task = asyncio.create_task(self._background_refresh())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _background_refresh(self):
+        async with self._get_lock():
+            if self._expires_at is None or datetime.now(timezone.utc) < self._expires_at - self.refresh_margin:
+                # Invalidated (callers refresh on demand) or already refreshed
+                return
+            try:
+                await self._refresh()
+            except ExternalServiceException:
+                logger.warning("Proactive token refresh failed, keeping the current token")
+
+    async def _refresh(self):
+        # A token still far from expiry in the store was published by another worker
+        if await self._load_shared():
+            return
+
+        try:
+            leased = await run_in_threadpool(acquire_token_lease, self.store_key, self.holder, self.lease_seconds)
+        except Exception:
+            logger.warning("Shared token store unavailable, fetching a local token", exc_info=True)
+            await self._fetch()
+            return
+
+        if not leased:
+            # Another worker is fetching the token, wait for it to be published
+            waited = 0.0
+            while waited < self.shared_wait:
+                await asyncio.sleep(_SHARED_POLL_INTERVAL)
+                waited += _SHARED_POLL_INTERVAL
+                if await self._load_shared():
+                    return
+            await self._fetch()
+            return
+
+        try:
+            await self._fetch()
+            await run_in_threadpool(
+                save_shared_token,
+                self.store_key,
+                self._access_token,
+                self._expires_at.replace(tzinfo=None)
+            )
+        except ExternalServiceException:
+            raise
+        except Exception:
+            logger.warning("Could not publish the token to the shared store", exc_info=True)
+        finally:
+            try:
+                await run_in_threadpool(release_token_lease, self.store_key, self.holder)
+            except Exception:
+                logger.warning("Could not release the token lease", exc_info=True)
+
+    async def _load_shared(self) -> bool:
+        try:
+            shared = await run_in_threadpool(load_shared_token, self.store_key)
+        except Exception:
+            logger.warning("Could not read the shared token store", exc_info=True)
+            return False
+        if not shared:
+            return False
+
+        # PyMongo returns naive UTC datetimes
+        expires_at = shared["expires_at"].replace(tzinfo=timezone.utc)
+        if datetime.now(timezone.utc) >= expires_at - self.refresh_margin:
+            return False
+
+        self._access_token = shared["access_token"]
+        self._expires_at = expires_at
+        self.shared_loads += 1
+        return True
+
+    async def _fetch(self):
+        payload = {
+            'client_id': self.client_id,
+            'client_secret': self.client_secret,
+            'grant_type': 'client_credentials'
+        }
+        started = time.perf_counter()
+        status = "error"
+        try:
+            with span("twitch POST /oauth2/token"):
+                response = await get_http_client().post(self.token_url, data=payload)
+            status = str(response.status_code)
+            response.raise_for_status()
+            token_data = response.json()
+        except httpx.HTTPError as e:
+            raise ExternalServiceException("Twitch Authentication", str(e))
+        finally:
+            twitch_request_duration.observe(time.perf_counter() - started, "/oauth2/token", status)
+
+        self.fetches += 1
+        self._access_token = token_data['access_token']
+        expires_in = token_data.get('expires_in', 0)
+        self._expires_at = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
+
+twitch_token_manager = TwitchTokenManager()
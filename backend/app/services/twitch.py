@@ -1,136 +1,225 @@
-import requests
-from typing import Optional, List, Dict
-from datetime import datetime, timedelta, timezone
+import asyncio
+import logging
+import time
+import httpx
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple
 from app.core.config import get_settings
-from app.core.errors.exceptions import ExternalServiceException
+from app.core.errors.exceptions import ExternalServiceException, ValidationException
+from app.core.metrics import twitch_request_duration
+from app.core.tracing import span
+from app.services.game_resolver import GameResolver
+from app.services.http_client import get_http_client
+from app.services.rate_limiter import Priority, helix_rate_limiter
+from app.services.token_manager import twitch_token_manager
+
+logger = logging.getLogger(__name__)
 
 settings = get_settings()
 
+HELIX_MAX_PAGE_SIZE = 100
+
 class TwitchService:
     def __init__(self):
         self.client_id = settings.twitch_client_id
-        self.client_secret = settings.twitch_client_secret
-        self.token_url = settings.twitch_token_url
         self.api_base_url = settings.twitch_api_url
-        self.access_token = None
-        self.token_expiry = None
+        self.token_manager = twitch_token_manager
+        self.rate_limiter = helix_rate_limiter
 
-    def get_access_token(self) -> str:
-        try:
-            if self.access_token and self.token_expiry and datetime.now(timezone.utc) < self.token_expiry:
-                return self.access_token  # Reuse the token if it's still valid
+    async def get_access_token(self) -> str:
+        return await self.token_manager.get_token()
 
-            payload = {
-                'client_id': self.client_id,
-                'client_secret': self.client_secret,
-                'grant_type': 'client_credentials'
-            }
-            
-            response = requests.post(self.token_url, data=payload)
-            response.raise_for_status()
-            token_data = response.json()
-            self.access_token = token_data['access_token']
-            expires_in = token_data.get('expires_in', 0)
-            self.token_expiry = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
-            return self.access_token
-        except requests.RequestException as e:
-            raise ExternalServiceException("Twitch Authentication", str(e))
-    
-    def autocomplete_games(self, query: str) -> List[Dict]:
-        try:
-            access_token = self.get_access_token()
+    async def _helix_get(
+        self,
+        path: str,
+        params: Dict[str, Any],
+        priority: Priority = Priority.INTERACTIVE
+    ) -> Dict[str, Any]:
+        retried_auth = False
+        retried_rate_limit = False
+        while True:
+            access_token = await self.get_access_token()
             headers = {
                 'Client-ID': self.client_id,
                 'Authorization': f'Bearer {access_token}'
             }
-            url = f"{self.api_base_url}/search/categories"
-            params = {'query': query}
-
-            response = requests.get(url, headers=headers, params=params)
+            async with self.rate_limiter.slot(priority):
+                started = time.perf_counter()
+                status = "error"
+                try:
+                    with span(f"twitch GET {path}", **{"http.method": "GET", "http.route": path}):
+                        response = await get_http_client().get(f"{self.api_base_url}{path}", headers=headers, params=params)
+                    status = str(response.status_code)
+                finally:
+                    twitch_request_duration.observe(time.perf_counter() - started, path, status)
+                self.rate_limiter.update(response.headers, response.status_code)
+
+            if response.status_code == 401 and not retried_auth:
+                # Token revoked or rotated: drop it and retry once with a new one
+                retried_auth = True
+                await self.token_manager.invalidate(access_token)
+                continue
+            if response.status_code == 429 and not retried_rate_limit:
+                # The scheduler now holds the call until the bucket resets
+                retried_rate_limit = True
+                continue
             response.raise_for_status()
-            results = response.json().get('data', [])
+            return response.json()
+
+    async def autocomplete_games(self, query: str) -> List[Dict]:
+        try:
+            results = (await self._helix_get("/search/categories", {'query': query})).get('data', [])
             return results
         except ExternalServiceException:
             # Re-raise already handled exceptions
             raise
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             raise ExternalServiceException("Twitch API", f"Game autocomplete failed: {str(e)}")
 
-    def get_game_id(self, game_name: str) -> str:
+    async def get_games(
+        self,
+        game_ids: Optional[List[str]] = None,
+        names: Optional[List[str]] = None,
+        priority: Priority = Priority.INTERACTIVE
+    ) -> List[Dict]:
+        """Fetches games by ID and name in one Helix call, at most 100 of both together."""
+        params = {}
+        if game_ids:
+            params['id'] = game_ids
+        if names:
+            params['name'] = names
+        if not params:
+            return []
         try:
-            access_token = self.get_access_token()
-            headers = {
-                'Client-ID': self.client_id,
-                'Authorization': f'Bearer {access_token}'
-            }
-            url = f"{self.api_base_url}/games"
-            params = {'name': game_name}
-
-            response = requests.get(url, headers=headers, params=params)
-            response.raise_for_status()
-            data = response.json().get('data', [])
-            
-            if not data:
-                return None
-            
-            game_id = data[0]['id']
-            return game_id
+            return (await self._helix_get("/games", params, priority)).get('data', [])
         except ExternalServiceException:
             # Re-raise already handled exceptions
             raise
-        except requests.RequestException as e:
-            raise ExternalServiceException("Twitch API", f"Game ID lookup failed: {str(e)}")
+        except httpx.HTTPError as e:
+            raise ExternalServiceException("Twitch API", f"Game lookup failed: {str(e)}")
 
-    def get_videos_by_game_id(
+    async def get_game_id(self, game_name: str) -> str:
+        # Resolved locally, Helix is only asked for unknown or stale games
+        return await game_resolver.get_game_id(game_name)
+
+    async def iter_videos_by_game_id(
+        self,
+        game_id: str,
+        language: Optional[str] = None,
+        sort: Optional[str] = None,
+        period: Optional[str] = None,
+        max_results: int = HELIX_MAX_PAGE_SIZE,
+        priority: Priority = Priority.INTERACTIVE
+    ) -> AsyncIterator[List[Dict]]:
+        """
+        Yields pages of videos for a game, following Helix pagination cursors
+        until `max_results` videos have been fetched or no page is left.
+        """
+        async for videos, _ in self.iter_video_pages(game_id, language, sort, period, max_results, priority):
+            yield videos
+
+    async def iter_video_pages(
+        self,
+        game_id: str,
+        language: Optional[str] = None,
+        sort: Optional[str] = None,
+        period: Optional[str] = None,
+        max_results: int = HELIX_MAX_PAGE_SIZE,
+        priority: Priority = Priority.INTERACTIVE,
+        after: Optional[str] = None
+    ) -> AsyncIterator[Tuple[List[Dict], Optional[str]]]:
+        """
+        Like `iter_videos_by_game_id`, starting after the `after` cursor, and
+        yields each page with the cursor of the next one (None on the last page).
+        Raises `ValidationException` when Helix rejects the `after` cursor.
+        """
+        params = {'game_id': game_id}
+
+        if language:
+            params['language'] = language
+        if sort in ['time', 'trending', 'views']:
+            params['sort'] = sort
+        if period in ['all', 'day', 'week', 'month']:
+            params['period'] = period
+        if after:
+            params['after'] = after
+
+        remaining = max_results
+        while remaining > 0:
+            params['first'] = min(remaining, HELIX_MAX_PAGE_SIZE)
+            try:
+                payload = await self._helix_get("/videos", params, priority)
+            except ExternalServiceException:
+                # Re-raise already handled exceptions
+                raise
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code == 400 and after and params['after'] == after:
+                    raise ValidationException("Cursor Helix invalide ou expiré")
+                raise ExternalServiceException("Twitch API", f"Video retrieval failed: {str(e)}")
+            except httpx.HTTPError as e:
+                raise ExternalServiceException("Twitch API", f"Video retrieval failed: {str(e)}")
+
+            videos = payload.get('data', [])
+            if not videos:
+                return
+            cursor = payload.get('pagination', {}).get('cursor') or None
+            yield videos, cursor
+
+            remaining -= len(videos)
+            if not cursor:
+                return
+            params['after'] = cursor
+
+    async def get_videos_by_game_id(
         self,
         game_id: str,
         language: Optional[str] = None,
         sort: Optional[str] = None,
-        period: Optional[str] = None
+        period: Optional[str] = None,
+        max_results: int = 50,
+        priority: Priority = Priority.INTERACTIVE
     ) -> List[Dict]:
-        try:
-            access_token = self.get_access_token()
-            headers = {
-                'Client-ID': self.client_id,
-                'Authorization': f'Bearer {access_token}'
-            }
-
-            url = f"{self.api_base_url}/videos"
-            params = {
-                'game_id': game_id,
-                'first': 50,
-            }
-
-            if language:
-                params['language'] = language
-            if sort in ['time', 'trending', 'views']:
-                params['sort'] = sort
-            if period in ['all', 'day', 'week', 'month']:
-                params['period'] = period
-
-            response = requests.get(url, headers=headers, params=params)
-            response.raise_for_status()
-            videos = response.json().get('data', [])
-            return videos
-        except ExternalServiceException:
-            # Re-raise already handled exceptions
-            raise
-        except requests.RequestException as e:
-            raise ExternalServiceException("Twitch API", f"Video retrieval failed: {str(e)}")
+        videos = []
+        async for page in self.iter_videos_by_game_id(game_id, language, sort, period, max_results, priority):
+            videos.extend(page)
+        return videos
 
-    def search_videos_by_game_name(self, game_name: str) -> List[Dict]:
+    async def get_videos_by_ids(
+        self,
+        video_ids: List[str],
+        priority: Priority = Priority.INTERACTIVE
+    ) -> List[Dict]:
+        """
+        Fetches videos by ID, `HELIX_MAX_PAGE_SIZE` IDs per Helix call, calls
+        running concurrently. A failed call only drops the videos of its
+        chunk; the error is raised if every call failed.
+        """
+        async def fetch(chunk: List[str]) -> List[Dict]:
+            try:
+                return (await self._helix_get("/videos", {'id': chunk}, priority)).get('data', [])
+            except ExternalServiceException:
+                # Re-raise already handled exceptions
+                raise
+            except httpx.HTTPError as e:
+                raise ExternalServiceException("Twitch API", f"Video lookup failed: {str(e)}")
+
+        chunks = [video_ids[start:start + HELIX_MAX_PAGE_SIZE] for start in range(0, len(video_ids), HELIX_MAX_PAGE_SIZE)]
+        pages = await asyncio.gather(*(fetch(chunk) for chunk in chunks), return_exceptions=True)
+        errors = [page for page in pages if isinstance(page, BaseException)]
+        if errors and len(errors) == len(pages):
+            raise errors[0]
+        for error in errors:
+            logger.warning("Helix video lookup of a chunk failed: %s", error)
+        return [video for page in pages if not isinstance(page, BaseException) for video in page]
+
+    async def search_videos_by_game_name(self, game_name: str) -> List[Dict]:
         try:
-            game_id = self.get_game_id(game_name)
+            game_id = await self.get_game_id(game_name)
             if not game_id:
                 return []
-            videos = self.get_videos_by_game_id(game_id)
+            videos = await self.get_videos_by_game_id(game_id)
             return videos
         except ExternalServiceException:
             # Already handled by the methods above
             raise
 
-
-
-
-
-
+game_resolver = GameResolver(fetch_games=TwitchService().get_games)
@@ -0,0 +1,101 @@
+import datetime
+import logging
+from typing import Any, Dict, List
+from app.core.config import get_settings
+from app.core.errors.exceptions import ExternalServiceException
+from app.models.models import helix_video_to_mongo
+from app.services.persistence import VideoPersistenceQueue, video_persistence_queue
+from app.services.twitch import TwitchService
+from app.services.video_repository import video_repository
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+class VideoLookupService:
+    """
+    Batch lookup of videos by ID for /api/videos/batch.
+
+    All requested videos are read with a single `$in` query. Videos missing
+    from the database, or not sampled for `stale_after` seconds, are fetched
+    from Helix in calls of 100 IDs and queued for persistence. Helix does not
+    say which game a video belongs to, so videos the database has never seen
+    are returned without being saved. If Helix is unavailable, stale videos
+    are still served from the database.
+    """
+
+    def __init__(
+        self,
+        twitch_service: TwitchService,
+        persistence_queue: VideoPersistenceQueue,
+        stale_after: float = settings.video_batch_stale_after,
+    ):
+        self.twitch_service = twitch_service
+        self.persistence_queue = persistence_queue
+        self.stale_after = datetime.timedelta(seconds=stale_after)
+        self.lookups = 0
+        self.db_hits = 0
+        self.helix_fetches = 0
+        self.helix_failures = 0
+        self.unknown_games = 0
+
+    async def lookup(self, video_ids: List[str]) -> Dict[str, Any]:
+        """Returns the found videos in request order, and the IDs found nowhere."""
+        video_ids = list(dict.fromkeys(video_ids))
+        self.lookups += 1
+
+        stored = await video_repository.get_many(video_ids)
+        stale_before = datetime.datetime.utcnow() - self.stale_after
+        to_fetch = [
+            video_id for video_id in video_ids
+            if video_id not in stored or (stored[video_id].get("last_sample_at") or stale_before) <= stale_before
+        ]
+        self.db_hits += len(video_ids) - len(to_fetch)
+
+        if to_fetch:
+            await self._refresh(to_fetch, stored)
+
+        videos = []
+        missing = []
+        for video_id in video_ids:
+            video = stored.get(video_id)
+            if video is None:
+                missing.append(video_id)
+                continue
+            video.pop("last_sample_at", None)
+            videos.append(video)
+        return {"videos": videos, "missing": missing}
+
+    async def _refresh(self, video_ids: List[str], stored: Dict[str, Dict[str, Any]]):
+        try:
+            fetched = await self.twitch_service.get_videos_by_ids(video_ids)
+        except ExternalServiceException:
+            self.helix_failures += 1
+            logger.warning("Helix video lookup failed, serving %d videos from the database only", len(video_ids))
+            return
+        self.helix_fetches += len(fetched)
+
+        documents = []
+        for video in fetched:
+            previous = stored.get(video["id"], {})
+            # Helix video objects carry no game_id, keep the one we stored
+            document = helix_video_to_mongo(video, previous.get("game_id"))
+            stored[video["id"]] = {**previous, **document}
+            if "game_id" in document:
+                documents.append(document)
+            else:
+                # Served, but not saved: a stored video needs its game for the lists and facets
+                self.unknown_games += 1
+        if documents:
+            await self.persistence_queue.enqueue(documents)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "lookups": self.lookups,
+            "db_hits": self.db_hits,
+            "helix_fetches": self.helix_fetches,
+            "helix_failures": self.helix_failures,
+            "unknown_games": self.unknown_games,
+        }
+
+video_lookup_service = VideoLookupService(TwitchService(), video_persistence_queue)
@@ -0,0 +1,271 @@
+import datetime
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+from pymongo.errors import BulkWriteError, PyMongoError
+from app.db.mongo import (
+    get_async_collection,
+    get_async_video_rollup_collection,
+    get_async_video_rollup_user_collection,
+    get_async_video_version_collection,
+    get_async_view_sample_collection,
+)
+from app.db.pagination import encode_cursor
+from app.core.config import get_settings
+from app.core.metrics import timed_mongo
+from app.core.errors.exceptions import DatabaseException, ResourceNotFoundException, ValidationException
+from app.services.mongo_services import (
+    ALL_GAMES_VERSION_KEY,
+    count_cache,
+    plan_video_query,
+    rollup_update_operations,
+    rollup_user_operations,
+    version_bump_operations,
+    version_cache,
+    video_upsert_operations,
+    view_sample_documents,
+)
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+class VideoRepository:
+    """
+    Async access to the videos collection for the API request path.
+
+    Queries go through the event loop's `AsyncMongoClient`, so a pending read
+    does not hold a threadpool thread and one worker can keep thousands of
+    them in flight, up to `mongodb_max_pool_size` connections. Failures are
+    raised as `DatabaseException` and missing videos as
+    `ResourceNotFoundException`, like `mongo_services`.
+    """
+
+    def __init__(self, bulk_batch_size: int = settings.mongodb_bulk_batch_size):
+        self.bulk_batch_size = bulk_batch_size
+
+    @timed_mongo("get_videos_from_db")
+    async def find_videos(
+        self,
+        game_id: Optional[str] = None,
+        language: Optional[str] = None,
+        sort: Optional[str] = None,
+        period: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        with_total: bool = True,
+        q: Optional[str] = None,
+        version: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Returns a page of stored videos (see `plan_video_query` for the filters),
+        the total count (None when not requested) and the continuation token
+        of the next page (None on the last page). `skip` is ignored with a `cursor`.
+
+        `version` is the list version the caller derived its ETag from; a
+        cached count is only reused under the same version, so a response
+        never pairs a new ETag with a total counted before the change.
+        """
+        try:
+            query = plan_video_query(game_id, language, sort, period, cursor, q)
+
+            total_count = None
+            if with_total:
+                total_count = await self.count(query["count_filter"], cache_key=(game_id, language, period, q, version))
+
+            db_cursor = get_async_collection().find(query["filter"], query["projection"]).sort(query["sort"])
+            if not cursor:
+                db_cursor = db_cursor.skip(skip)
+
+            # Fetch one extra video to know whether there is a next page
+            videos = await db_cursor.limit(limit + 1).to_list()
+            has_more = len(videos) > limit
+            videos = videos[:limit]
+
+            next_cursor = None
+            if has_more and query["keyset_sort"]:
+                next_cursor = encode_cursor(query["keyset_sort"], videos[-1], query["sort"])
+
+            return {
+                "videos": videos,
+                "total_count": total_count,
+                "next_cursor": next_cursor
+            }
+        except (ValidationException, DatabaseException):
+            raise
+        except PyMongoError as e:
+            raise DatabaseException(operation="query", detail=str(e))
+        except Exception:
+            raise DatabaseException(operation="query", detail="Unexpected error occurred")
+
+    @timed_mongo("count_videos")
+    async def count(self, filter_query: Dict[str, Any], cache_key: Optional[tuple] = None) -> int:
+        """
+        Counts the videos matching `filter_query`.
+
+        The unfiltered count comes from the collection metadata, and filtered
+        counts are cached for `videos_count_cache_ttl` seconds under `cache_key`.
+        """
+        try:
+            if not filter_query:
+                return await get_async_collection().estimated_document_count()
+
+            if cache_key is not None:
+                cached = count_cache.get(cache_key)
+                if cached is not None:
+                    return cached
+
+            total_count = await get_async_collection().count_documents(filter_query)
+        except PyMongoError as e:
+            raise DatabaseException(operation="count", detail=str(e))
+        if cache_key is not None:
+            count_cache.set(cache_key, total_count)
+        return total_count
+
+    @timed_mongo("get_video_document")
+    async def get_video(self, video_id: str) -> Dict[str, Any]:
+        """Returns a video with its `content_hash` and `last_sample_at`, for responses carrying an ETag."""
+        try:
+            video = await get_async_collection().find_one({"id": video_id}, {"_id": 0, "last_sample_views": 0})
+        except PyMongoError as e:
+            raise DatabaseException(operation="find", detail=str(e))
+        if not video:
+            raise ResourceNotFoundException("Video", video_id)
+        return video
+
+    @timed_mongo("get_video_validator")
+    async def get_validator(self, video_id: str) -> Optional[Dict[str, Any]]:
+        """Returns the fields an ETag of a video is derived from, without reading the document."""
+        try:
+            return await get_async_collection().find_one(
+                {"id": video_id},
+                {"_id": 0, "content_hash": 1, "trending_score": 1, "last_sample_at": 1}
+            )
+        except PyMongoError as e:
+            raise DatabaseException(operation="find_validator", detail=str(e))
+
+    @timed_mongo("get_videos_by_ids")
+    async def get_many(self, video_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Returns the stored videos among `video_ids`, by id, with their `last_sample_at`, in one `$in` query."""
+        try:
+            cursor = get_async_collection().find(
+                {"id": {"$in": video_ids}},
+                {"_id": 0, "last_sample_views": 0, "content_hash": 0}
+            )
+            return {video["id"]: video async for video in cursor}
+        except PyMongoError as e:
+            raise DatabaseException(operation="find_many", detail=str(e))
+
+    @timed_mongo("get_video_version")
+    async def get_version(self, game_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Returns the list version (`version`, `updated_at`) covering the videos of a
+        game, or of every game without `game_id`. Cached for `video_versions_cache_ttl` seconds.
+        """
+        key = game_id or ALL_GAMES_VERSION_KEY
+        cached = version_cache.get(key)
+        if cached is not None:
+            return cached
+        try:
+            document = await get_async_video_version_collection().find_one({"_id": key})
+        except PyMongoError as e:
+            raise DatabaseException(operation="find_version", detail=str(e))
+        version = {
+            "version": document["version"] if document else 0,
+            "updated_at": document["updated_at"] if document else None,
+        }
+        version_cache.set(key, version)
+        return version
+
+    @timed_mongo("save_multiple_videos")
+    async def upsert(self, documents: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Upserts video documents (see `helix_video_to_mongo`) with unordered bulk writes of `mongodb_bulk_batch_size` operations.
+
+        Each upsert also refreshes the video's trending score, and a
+        (video_id, ts, view_count) sample is appended to the view samples
+        time series. A failing document does not stop the rest of its batch;
+        failures are counted from the bulk write error details.
+
+        Every document stores a `content_hash` of its Helix fields, and the
+        list versions of the games whose videos changed are bumped, so
+        conditional GETs can be answered without reading the videos. Videos
+        inserted (not updated) are added to the facet rollups of their game.
+        """
+        success_count = 0
+        error_count = 0
+        changed_games = set()
+        inserted: List[Dict[str, Any]] = []
+        now = datetime.datetime.utcnow()
+        operations = video_upsert_operations(documents, now)
+
+        for start in range(0, len(operations), self.bulk_batch_size):
+            batch = operations[start:start + self.bulk_batch_size]
+            batch_documents = documents[start:start + self.bulk_batch_size]
+            batch_games = {document.get("game_id") for document in batch_documents}
+            try:
+                result = await get_async_collection().bulk_write(batch, ordered=False)
+                success_count += len(batch)
+                if result.modified_count or result.upserted_count:
+                    changed_games.update(batch_games)
+                inserted.extend(batch_documents[index] for index in result.upserted_ids)
+            except BulkWriteError as e:
+                failed = len(e.details.get("writeErrors", []))
+                success_count += len(batch) - failed
+                error_count += failed
+                changed_games.update(batch_games)
+                inserted.extend(batch_documents[upsert["index"]] for upsert in e.details.get("upserted", []))
+                logger.warning("Bulk upsert batch had %d errors out of %d operations", failed, len(batch))
+            except PyMongoError as e:
+                error_count += len(batch)
+                logger.error("Bulk upsert batch of %d operations failed: %s", len(batch), e)
+
+        logger.debug("Bulk upsert completed: %d success, %d errors", success_count, error_count)
+        if error_count > 0 and success_count == 0:
+            raise DatabaseException(operation="batch_insert", detail=f"All {error_count} insertions failed")
+
+        await self._save_view_samples(documents, now)
+        if inserted:
+            await self._update_rollups(inserted)
+        if changed_games:
+            await self._bump_versions(game_id for game_id in changed_games if game_id)
+
+        return {
+            "success_count": success_count,
+            "error_count": error_count
+        }
+
+    async def _save_view_samples(self, documents: List[Dict[str, Any]], ts: datetime.datetime):
+        # Losing a sample is not worth failing the save
+        samples = view_sample_documents(documents, ts)
+        if not samples:
+            return
+        try:
+            await get_async_view_sample_collection().insert_many(samples, ordered=False)
+        except PyMongoError as e:
+            logger.warning("Could not save %d view samples: %s", len(samples), e)
+
+    async def _update_rollups(self, inserted: List[Dict[str, Any]]):
+        # A rollup that drifted is caught and rebuilt by the facets service
+        for collection, operations in (
+            (get_async_video_rollup_collection(), rollup_update_operations(inserted)),
+            (get_async_video_rollup_user_collection(), rollup_user_operations(inserted)),
+        ):
+            if not operations:
+                continue
+            try:
+                await collection.bulk_write(operations, ordered=False)
+            except PyMongoError as e:
+                logger.warning("Could not update %d video rollups: %s", len(operations), e)
+
+    async def _bump_versions(self, game_ids: Iterable[str]):
+        # Losing a bump only delays revalidation until the next one
+        keys = [*game_ids, ALL_GAMES_VERSION_KEY]
+        try:
+            await get_async_video_version_collection().bulk_write(version_bump_operations(keys), ordered=False)
+        except PyMongoError as e:
+            logger.warning("Could not bump %d video list versions: %s", len(keys), e)
+        for key in keys:
+            version_cache.pop(key)
+
+video_repository = VideoRepository()
@@ -0,0 +1,239 @@
+import asyncio
+import heapq
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from app.core.cache import SingleFlight, TTLCache
+from app.core.config import get_settings
+from app.models.models import helix_video_to_mongo
+from app.services.persistence import VideoPersistenceQueue, video_persistence_queue
+from app.services.twitch import HELIX_MAX_PAGE_SIZE, TwitchService
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Helix defaults, so that omitted and explicit parameters share a cache entry
+DEFAULT_SORT = "time"
+DEFAULT_PERIOD = "all"
+
+SearchKey = Tuple[str, Optional[str], str, str]
+
+# Helix returns each game's videos in descending order of these keys
+MERGE_KEYS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "time": lambda video: video.get("created_at") or "",
+    "views": lambda video: video.get("view_count", 0),
+}
+
+@dataclass
+class CachedSearch:
+    videos: List[Dict[str, Any]]
+    exhausted: bool  # True when Helix has no video left past `videos` for this query
+
+@dataclass
+class MultiGameSearch:
+    videos_by_game: Dict[str, List[Dict[str, Any]]]
+    timed_out: List[str] = field(default_factory=list)  # Past the deadline, still searched in the background
+    failed: List[str] = field(default_factory=list)
+    has_more: bool = False  # True when a game has videos past `max_results`
+
+    @property
+    def partial(self) -> bool:
+        return bool(self.timed_out or self.failed)
+
+def _interleave(video_lists: List[List[Dict[str, Any]]]) -> Iterator[Dict[str, Any]]:
+    iterators = [iter(videos) for videos in video_lists]
+    while iterators:
+        for iterator in list(iterators):
+            video = next(iterator, None)
+            if video is None:
+                iterators.remove(iterator)
+            else:
+                yield video
+
+def merge_videos(video_lists: Iterable[List[Dict[str, Any]]], sort: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily merges per-game result lists in the requested order, so taking a
+    page only walks the videos before its end. Helix's trending order has no
+    comparable key across games, those lists are interleaved instead.
+    """
+    video_lists = list(video_lists)
+    key = MERGE_KEYS.get(sort or DEFAULT_SORT)
+    if key is None:
+        return _interleave(video_lists)
+    return heapq.merge(*video_lists, key=key, reverse=True)
+
+class VideoSearchService:
+    """
+    Cached front of `TwitchService.iter_video_pages` for /api/search.
+
+    Results are cached per normalized (game_id, language, sort, period) with
+    a per-sort TTL and LRU bounds on the number of cached searches and on
+    the number of videos they hold together. An entry serves any request
+    for up to as many videos as it holds. Concurrent misses for the same
+    search share a single Helix fetch; a request needing more videos than
+    the fetch in flight waits for it, then fetches again with its own
+    budget. Only fetched pages are handed to the persistence queue.
+    """
+
+    def __init__(
+        self,
+        twitch_service: TwitchService,
+        persistence_queue: VideoPersistenceQueue,
+        maxsize: int = settings.search_cache_max_entries,
+        max_videos: int = settings.search_cache_max_videos,
+    ):
+        self.twitch_service = twitch_service
+        self.persistence_queue = persistence_queue
+        self.ttls = {
+            "time": settings.search_cache_ttl_time,
+            "trending": settings.search_cache_ttl_trending,
+            "views": settings.search_cache_ttl_views,
+        }
+        self._cache = TTLCache(
+            maxsize=maxsize,
+            ttl=settings.search_cache_ttl_time,
+            maxweight=max_videos,
+            weigh=lambda entry: len(entry.videos)
+        )
+        self._single_flight = SingleFlight()
+        self._searches: Set[asyncio.Task] = set()
+        self.hits = 0
+
+    @staticmethod
+    def normalize_key(
+        game_id: str,
+        language: Optional[str] = None,
+        sort: Optional[str] = None,
+        period: Optional[str] = None
+    ) -> SearchKey:
+        return (
+            game_id.strip(),
+            language.strip().lower() if language else None,
+            sort if sort in ("time", "trending", "views") else DEFAULT_SORT,
+            period if period in ("all", "day", "week", "month") else DEFAULT_PERIOD,
+        )
+
+    async def search(
+        self,
+        game_id: str,
+        language: Optional[str] = None,
+        sort: Optional[str] = None,
+        period: Optional[str] = None,
+        max_results: int = HELIX_MAX_PAGE_SIZE
+    ) -> CachedSearch:
+        """Returns up to `max_results` videos, from the cache when it holds enough."""
+        key = self.normalize_key(game_id, language, sort, period)
+
+        entry: Optional[CachedSearch] = self._cache.get(key)
+        if entry is not None and (entry.exhausted or len(entry.videos) >= max_results):
+            self.hits += 1
+            return self._first(entry, max_results)
+
+        # Round the budget up to whole Helix pages so close requests share a fetch
+        budget = -(-max_results // HELIX_MAX_PAGE_SIZE) * HELIX_MAX_PAGE_SIZE
+        budget = min(budget, max(max_results, settings.twitch_search_max_results))
+        while True:
+            entry = await self._single_flight.do(key, lambda: self._fetch(key, budget))
+            if entry.exhausted or len(entry.videos) >= max_results:
+                return self._first(entry, max_results)
+            # Joined a fetch for fewer videos, now done: start one with our budget
+
+    @staticmethod
+    def _first(entry: CachedSearch, max_results: int) -> CachedSearch:
+        return CachedSearch(
+            videos=entry.videos[:max_results],
+            exhausted=entry.exhausted and len(entry.videos) <= max_results
+        )
+
+    async def search_many(
+        self,
+        game_ids: List[str],
+        language: Optional[str] = None,
+        sort: Optional[str] = None,
+        period: Optional[str] = None,
+        max_results: int = HELIX_MAX_PAGE_SIZE,
+        concurrency: int = settings.search_fanout_concurrency,
+        deadline: Optional[float] = settings.search_fanout_deadline
+    ) -> MultiGameSearch:
+        """
+        Searches several games concurrently, at most `concurrency` at a time.
+
+        Games not done after `deadline` seconds, running or still waiting
+        for a slot, are reported as timed out rather than holding back the
+        others. Only the caller stops waiting: their searches go on in the
+        background, still `concurrency` at a time, and fill the cache for
+        the next request. Failed games are reported too, and their error is
+        raised only if every game failed.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def search_game(game_id: str) -> CachedSearch:
+            async with semaphore:
+                return await self.search(game_id, language, sort, period, max_results)
+
+        tasks = {game_id: asyncio.create_task(search_game(game_id)) for game_id in game_ids}
+        for task in tasks.values():
+            # Referenced until done, the caller may stop waiting first
+            self._searches.add(task)
+            task.add_done_callback(self._search_done)
+        _, pending = await asyncio.wait(tasks.values(), timeout=deadline)
+
+        result = MultiGameSearch(videos_by_game={})
+        errors = []
+        for game_id, task in tasks.items():
+            if task in pending:
+                result.timed_out.append(game_id)
+            elif task.exception() is not None:
+                result.failed.append(game_id)
+                errors.append(task.exception())
+                logger.warning("Search for game %s failed: %s", game_id, task.exception())
+            else:
+                result.videos_by_game[game_id] = task.result().videos
+                result.has_more = result.has_more or not task.result().exhausted
+
+        if errors and len(errors) == len(game_ids):
+            raise errors[0]
+        return result
+
+    def _search_done(self, task: asyncio.Task):
+        self._searches.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug("Game search failed: %s", task.exception())
+
+    async def _fetch(self, key: SearchKey, budget: int) -> CachedSearch:
+        game_id, language, sort, period = key
+        videos: List[Dict[str, Any]] = []
+        cursor = None
+        async for videos_page, cursor in self.twitch_service.iter_video_pages(
+            game_id=game_id,
+            language=language,
+            sort=sort,
+            period=period,
+            max_results=budget
+        ):
+            # Helix video objects carry no game_id, merged searches need it
+            videos.extend({**video, "game_id": game_id} for video in videos_page)
+            await self.persistence_queue.enqueue(
+                [helix_video_to_mongo(video, game_id) for video in videos_page]
+            )
+
+        entry = CachedSearch(videos=videos, exhausted=len(videos) < budget or cursor is None)
+        self._cache.set(key, entry, ttl=self.ttls[sort])
+        return entry
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._cache),
+            "maxsize": self._cache.maxsize,
+            "videos": self._cache.weight,
+            "max_videos": self._cache.maxweight,
+            "evictions": self._cache.evictions,
+            "hits": self.hits,
+            "misses": self._single_flight.calls,
+            "coalesced": self._single_flight.coalesced,
+            "in_flight": self._single_flight.in_flight(),
+            "fanout_searches": len(self._searches),
+        }
+
+video_search_service = VideoSearchService(TwitchService(), video_persistence_queue)
@@ -0,0 +1,154 @@
+"""
+Background ingestion worker keeping the videos collection warm.
+
+Crawls the games listed in `INGEST_GAME_IDS` every `ingest_interval_seconds`
+and upserts their new videos, so /api/videos can be served from MongoDB
+without waiting on a user search. Run it as its own process:
+
+    python -m app.workers.ingest            # crawl forever
+    python -m app.workers.ingest --once     # single pass, e.g. from cron
+"""
+import argparse
+import asyncio
+import logging
+from typing import List, Optional
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import get_settings
+from app.core.errors.exceptions import ValidationException
+from app.models.models import helix_video_to_mongo
+from app.db.mongo import close_async_mongo, close_mongo
+from app.services.http_client import close_http_client
+from app.services.mongo_services import get_ingest_state, set_ingest_high_water, set_ingest_resume
+from app.services.rate_limiter import Priority
+from app.services.twitch import TwitchService
+from app.services.video_repository import video_repository
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+class VideoIngestionWorker:
+    """
+    Incremental crawler over a fixed set of games.
+
+    Each game has a high-water mark: the `created_at` of the newest video
+    ingested so far. A run walks the game's videos newest first and stops at
+    the first page reaching the mark, so only new videos are fetched. The
+    mark only moves once a crawl reaches it or Helix runs out of pages: a
+    crawl that runs out of `max_videos_per_game` first saves its Helix
+    cursor, and the next run resumes from there. Games
+    are crawled concurrently, and their Helix calls go through the rate
+    limiter at background priority, behind user-facing traffic.
+    """
+
+    def __init__(
+        self,
+        twitch_service: TwitchService,
+        game_ids: List[str],
+        concurrency: int = settings.ingest_concurrency,
+        max_videos_per_game: int = settings.ingest_max_videos_per_game,
+        interval: float = settings.ingest_interval_seconds,
+    ):
+        self.twitch_service = twitch_service
+        self.game_ids = game_ids
+        self.concurrency = concurrency
+        self.max_videos_per_game = max_videos_per_game
+        self.interval = interval
+
+    async def crawl_game(self, game_id: str) -> int:
+        """Ingests the videos of a game newer than its high-water mark and returns how many."""
+        state = await run_in_threadpool(get_ingest_state, game_id)
+        high_water = state.get("high_water")
+        resume_cursor = state.get("resume_cursor")
+        newest = state.get("resume_high_water") if resume_cursor else None
+        cursor = resume_cursor
+        fetched = 0
+        ingested = 0
+        complete = False
+
+        try:
+            async for page, cursor in self.twitch_service.iter_video_pages(
+                game_id=game_id,
+                sort="time",
+                max_results=self.max_videos_per_game,
+                priority=Priority.BACKGROUND,
+                after=resume_cursor
+            ):
+                fetched += len(page)
+                # Videos at the mark are upserted again rather than risking a skip
+                fresh = [video for video in page if high_water is None or video["created_at"] >= high_water]
+                if fresh:
+                    await video_repository.upsert([helix_video_to_mongo(video, game_id) for video in fresh])
+                    ingested += len(fresh)
+                    page_newest = max(video["created_at"] for video in fresh)
+                    newest = page_newest if newest is None else max(newest, page_newest)
+                if len(fresh) < len(page):
+                    # Reached videos ingested by a previous run
+                    complete = True
+                    break
+            else:
+                # Helix ran out of pages before the budget did
+                complete = cursor is None or fetched < self.max_videos_per_game
+        except ValidationException:
+            # Helix rejected the saved cursor, which expires: crawl again from the newest video next run.
+            # Other errors keep it, the next run resumes from the same place.
+            logger.warning("Game %s: Helix rejected the resume cursor, restarting the crawl", game_id)
+            await run_in_threadpool(set_ingest_resume, game_id, None, None)
+            return 0
+
+        if complete:
+            await run_in_threadpool(set_ingest_high_water, game_id, newest)
+        else:
+            # Out of budget before the mark: keep it and continue from here next run
+            await run_in_threadpool(set_ingest_resume, game_id, cursor, newest)
+        return ingested
+
+    async def run_once(self) -> int:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def crawl(game_id: str) -> int:
+            async with semaphore:
+                try:
+                    ingested = await self.crawl_game(game_id)
+                    logger.info("Game %s: %d new videos", game_id, ingested)
+                    return ingested
+                except Exception:
+                    logger.exception("Game %s: ingestion failed", game_id)
+                    return 0
+
+        results = await asyncio.gather(*(crawl(game_id) for game_id in self.game_ids))
+        return sum(results)
+
+    async def run_forever(self):
+        while True:
+            total = await self.run_once()
+            logger.info("Ingestion pass done: %d new videos over %d games", total, len(self.game_ids))
+            await asyncio.sleep(self.interval)
+
+def parse_game_ids(value: str) -> List[str]:
+    return [game_id.strip() for game_id in value.split(",") if game_id.strip()]
+
+async def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Crawl Twitch videos into MongoDB")
+    parser.add_argument("--once", action="store_true", help="run a single pass and exit")
+    parser.add_argument("--games", default=settings.ingest_game_ids, help="comma-separated game IDs")
+    args = parser.parse_args(argv)
+
+    game_ids = parse_game_ids(args.games)
+    if not game_ids:
+        parser.error("no game to crawl, set INGEST_GAME_IDS or pass --games")
+
+    worker = VideoIngestionWorker(TwitchService(), game_ids)
+    try:
+        if args.once:
+            await worker.run_once()
+        else:
+            await worker.run_forever()
+    finally:
+        await close_http_client()
+        await close_async_mongo()
+        close_mongo()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(main())
@@ -0,0 +1,247 @@
+"""
+Local stand-in for the Twitch API, for load tests.
+
+Serves `/oauth2/token` and the Helix endpoints the backend calls
+(`/helix/games`, `/helix/search/categories`, `/helix/videos`) from a
+deterministic synthetic catalogue, with cursor pagination, `Ratelimit-*`
+headers backed by a token bucket, configurable latency and error injection.
+Point the backend at it with:
+
+    TWITCH_TOKEN_URL=http://127.0.0.1:8900/oauth2/token
+    TWITCH_API_URL=http://127.0.0.1:8900/helix
+
+and start it with `python -m benchmarks.fake_helix --port 8900`.
+"""
+import argparse
+import asyncio
+import base64
+import datetime
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import JSONResponse
+
+_WORDS = [
+    "legend", "dark", "souls", "craft", "world", "star", "racing", "city", "quest", "war",
+    "ninja", "dragon", "kart", "space", "hollow", "knight", "farm", "cyber", "zero", "royale",
+    "pixel", "tower", "dungeon", "galaxy", "storm", "rogue", "island", "party", "league", "arena",
+]
+_LANGUAGES = ["en", "fr", "de", "es", "pt", "ja", "ko", "ru"]
+_EPOCH = datetime.datetime(2024, 1, 1)
+
+@dataclass
+class FakeHelixConfig:
+    games: int = 500
+    videos_per_game: int = 2000
+    latency_ms: float = 20.0
+    jitter_ms: float = 10.0
+    error_rate: float = 0.0  # Share of Helix calls answered with a 503
+    rate_limit: int = 800  # Points per minute, Helix's default app bucket
+    seed: int = 42
+
+class TokenBucket:
+    """Helix-style bucket refilled continuously up to `limit` points per minute."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.tokens = float(limit)
+        self.updated = time.time()
+        self._lock = threading.Lock()
+
+    def take(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.time()
+            self.tokens = min(self.limit, self.tokens + (now - self.updated) * self.limit / 60)
+            self.updated = now
+            allowed = self.tokens >= 1
+            if allowed:
+                self.tokens -= 1
+            reset = now + (self.limit - self.tokens) * 60 / self.limit
+            return {"allowed": allowed, "remaining": int(self.tokens), "reset": int(reset) + 1}
+
+class Catalogue:
+    """Synthetic games and videos, identical for a given seed."""
+
+    def __init__(self, config: FakeHelixConfig):
+        self.config = config
+        rng = random.Random(config.seed)
+        self.games: List[Dict[str, str]] = []
+        for index in range(config.games):
+            name = " ".join(rng.sample(_WORDS, rng.randint(1, 3))).title()
+            self.games.append({
+                "id": str(10000 + index),
+                "name": f"{name} {index}" if index >= len(_WORDS) else name,
+                "box_art_url": f"https://static-cdn.jtvnw.net/ttv-boxart/{10000 + index}-{{width}}x{{height}}.jpg",
+            })
+        self.games_by_id = {game["id"]: game for game in self.games}
+        self.games_by_name = {game["name"].lower(): game for game in self.games}
+        self._orders: Dict[Tuple[str, bool], List[int]] = {}
+
+    def video(self, game_id: str, index: int) -> Dict[str, Any]:
+        # Newest first: index 0 is the most recent video of the game
+        rng = random.Random(f"{self.config.seed}:{game_id}:{index}")
+        created_at = (_EPOCH - datetime.timedelta(minutes=37 * index)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        video_id = f"{game_id}{index:07d}"
+        user = rng.randint(1, 5000)
+        return {
+            "id": video_id,
+            "stream_id": None,
+            "user_id": str(user),
+            "user_login": f"streamer{user}",
+            "user_name": f"Streamer{user}",
+            "title": " ".join(rng.choices(_WORDS, k=6)),
+            "description": " ".join(rng.choices(_WORDS, k=12)),
+            "created_at": created_at,
+            "published_at": created_at,
+            "url": f"https://www.twitch.tv/videos/{video_id}",
+            "thumbnail_url": f"https://static-cdn.jtvnw.net/cf_vods/{video_id}/thumb-%{{width}}x%{{height}}.jpg",
+            "viewable": "public",
+            "view_count": rng.randint(0, 200000),
+            "language": rng.choice(_LANGUAGES),
+            "type": "archive",
+            "duration": f"{rng.randint(0, 6)}h{rng.randint(0, 59)}m{rng.randint(0, 59)}s",
+            "muted_segments": None,
+        }
+
+    def video_order(self, game_id: str, sort: Optional[str]) -> List[int]:
+        """Video indexes of a game in Helix order: newest first, or most viewed first."""
+        key = (game_id, sort == "views")
+        if key not in self._orders:
+            indexes = list(range(self.config.videos_per_game))
+            if sort == "views":
+                indexes.sort(key=lambda index: self.video(game_id, index)["view_count"], reverse=True)
+            self._orders[key] = indexes
+        return self._orders[key]
+
+    def video_by_id(self, video_id: str) -> Optional[Dict[str, Any]]:
+        game_id, index = video_id[:-7], video_id[-7:]
+        if game_id not in self.games_by_id or not index.isdigit() or int(index) >= self.config.videos_per_game:
+            return None
+        return self.video(game_id, int(index))
+
+def encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(str(offset).encode()).decode()
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except ValueError:
+        return 0
+
+def create_app(config: FakeHelixConfig) -> FastAPI:
+    app = FastAPI(title="Fake Helix")
+    catalogue = Catalogue(config)
+    bucket = TokenBucket(config.rate_limit)
+    rng = random.Random(config.seed)
+    app.state.counters = {"requests": 0, "throttled": 0, "errors": 0, "tokens": 0}
+
+    @app.middleware("http")
+    async def helix_behaviour(request: Request, call_next):
+        if not request.url.path.startswith("/helix"):
+            return await call_next(request)
+        app.state.counters["requests"] += 1
+
+        delay = max(0.0, config.latency_ms + rng.uniform(-config.jitter_ms, config.jitter_ms))
+        await asyncio.sleep(delay / 1000)
+
+        state = bucket.take()
+        headers = {
+            "Ratelimit-Limit": str(config.rate_limit),
+            "Ratelimit-Remaining": str(state["remaining"]),
+            "Ratelimit-Reset": str(state["reset"]),
+        }
+        if not state["allowed"]:
+            app.state.counters["throttled"] += 1
+            return JSONResponse({"error": "Too Many Requests", "status": 429}, status_code=429, headers=headers)
+        if config.error_rate and rng.random() < config.error_rate:
+            app.state.counters["errors"] += 1
+            return JSONResponse({"error": "Service Unavailable", "status": 503}, status_code=503, headers=headers)
+
+        response = await call_next(request)
+        response.headers.update(headers)
+        return response
+
+    @app.post("/oauth2/token")
+    async def token():
+        app.state.counters["tokens"] += 1
+        return {"access_token": f"fake-{app.state.counters['tokens']}", "expires_in": 3600, "token_type": "bearer"}
+
+    @app.get("/helix/games")
+    async def games(id: List[str] = Query([]), name: List[str] = Query([])):
+        found = [catalogue.games_by_id[game_id] for game_id in id if game_id in catalogue.games_by_id]
+        found += [catalogue.games_by_name[value.lower()] for value in name if value.lower() in catalogue.games_by_name]
+        return {"data": found}
+
+    @app.get("/helix/search/categories")
+    async def search_categories(query: str, first: int = Query(20, le=100)):
+        needle = query.lower()
+        data = [game for game in catalogue.games if needle in game["name"].lower()][:first]
+        return {"data": data, "pagination": {}}
+
+    @app.get("/helix/videos")
+    async def videos(
+        id: List[str] = Query([]),
+        game_id: Optional[str] = None,
+        language: Optional[str] = None,
+        sort: Optional[str] = None,
+        first: int = Query(20, ge=1, le=100),
+        after: Optional[str] = None,
+    ):
+        if id:
+            return {"data": [video for video in map(catalogue.video_by_id, id) if video], "pagination": {}}
+        if game_id not in catalogue.games_by_id:
+            return {"data": [], "pagination": {}}
+
+        order = catalogue.video_order(game_id, sort)
+        position = decode_cursor(after)
+        data = []
+        while len(data) < first and position < len(order):
+            video = catalogue.video(game_id, order[position])
+            position += 1
+            if language is None or video["language"] == language:
+                data.append(video)
+        pagination = {"cursor": encode_cursor(position)} if position < len(order) else {}
+        return {"data": data, "pagination": pagination}
+
+    @app.get("/stats")
+    async def stats():
+        return app.state.counters
+
+    return app
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    defaults = FakeHelixConfig()
+    parser = argparse.ArgumentParser(description="Fake Twitch Helix server for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--games", type=int, default=defaults.games)
+    parser.add_argument("--videos-per-game", type=int, default=defaults.videos_per_game)
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=defaults.jitter_ms)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--rate-limit", type=int, default=defaults.rate_limit, help="points per minute")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    import uvicorn
+
+    args = parse_args(argv)
+    config = FakeHelixConfig(
+        games=args.games,
+        videos_per_game=args.videos_per_game,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+from typing import Any, Dict
+
+def helix_video(index: int) -> Dict[str, Any]:
+    """A video item as returned by Helix GET /videos."""
+    return {
+        "id": str(2000000000 + index),
+        "stream_id": None,
+        "user_id": "12345678",
+        "user_login": "streamer",
+        "user_name": "Streamer",
+        "title": f"Speedrun any% attempt #{index} - new PB? 🏃",
+        "description": "Playing the whole game with chat " * 3,
+        "created_at": "2024-05-01T18:30:00Z",
+        "published_at": "2024-05-01T18:30:00Z",
+        "url": f"https://www.twitch.tv/videos/{2000000000 + index}",
+        "thumbnail_url": "https://static-cdn.jtvnw.net/cf_vods/%{width}x%{height}/thumb.jpg",
+        "viewable": "public",
+        "view_count": 1000 + index,
+        "language": "en",
+        "type": "archive",
+        "duration": "3h2m1s",
+        "muted_segments": None,
+    }
@@ -0,0 +1,47 @@
+"""
+Micro-benchmark of the Helix-to-MongoDB video conversion.
+
+Compares building a `Video` model per item and calling `to_mongo_dict()`
+with the `helix_video_to_mongo` converter used by the ingestion path, at
+several batch sizes. Run from the backend folder:
+
+    python -m benchmarks.ingestion --sizes 50,500,1000,10000
+"""
+import argparse
+import timeit
+from typing import Any, Callable, Dict, List
+from app.models.models import Video, helix_video_to_mongo
+from benchmarks.fixtures import helix_video
+
+GAME_ID = "21779"
+
+def model_path(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [Video(**{**video, "game_id": GAME_ID}).to_mongo_dict() for video in batch]
+
+def converter_path(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [helix_video_to_mongo(video, GAME_ID) for video in batch]
+
+def bench(fn: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]], batch: List[Dict[str, Any]], repeat: int) -> float:
+    # Keep the total work per measurement roughly constant across sizes
+    number = max(1, 20000 // len(batch))
+    best = min(timeit.repeat(lambda: fn(batch), number=number, repeat=repeat)) / number
+    return best / len(batch)
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Benchmark Helix video conversion")
+    parser.add_argument("--sizes", default="50,500,1000,10000", help="comma-separated batch sizes")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    batch = [helix_video(0)]
+    assert model_path(batch) == converter_path(batch), "converter output differs from Video.to_mongo_dict()"
+
+    print(f"{'batch':>8} {'Video model':>16} {'converter':>16} {'speedup':>8}")
+    for size in (int(size) for size in args.sizes.split(",")):
+        batch = [helix_video(index) for index in range(size)]
+        model = bench(model_path, batch, args.repeat)
+        converter = bench(converter_path, batch, args.repeat)
+        print(f"{size:>8} {model * 1e6:>11.2f} µs/v {converter * 1e6:>11.2f} µs/v {model / converter:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+Load test of the API against the fake Helix server and a local mongod.
+
+Starts `benchmarks.fake_helix` and the API (uvicorn) as subprocesses, runs
+the scripted scenarios and writes latency percentiles and throughput per
+scenario to a JSON report, tagged with the current git commit so runs can
+be compared:
+
+    python -m benchmarks.loadtest --output results/$(git rev-parse --short HEAD).json
+    python -m benchmarks.loadtest --api-url http://127.0.0.1:8000  # already running API
+
+The API uses the `twitch_search_bench` database on `--mongodb-uri`, which
+is dropped at the start of each run.
+
+Scenarios:
+- autocomplete: users typing game names, one request per keystroke
+- search_fanin: many clients searching the same few games at once
+- videos_paging: clients walking /api/videos deep with `next_cursor`
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import httpx
+from benchmarks.fake_helix import Catalogue, FakeHelixConfig
+
+BENCH_DB_NAME = "twitch_search_bench"
+
+class Recorder:
+    """Collects request latencies and failures for one scenario."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: List[float] = []
+        self.status_codes: Dict[int, int] = {}
+        self.failures = 0
+        self.started = 0.0
+        self.finished = 0.0
+
+    async def get(self, client: httpx.AsyncClient, url: str, params: Dict[str, Any]) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await client.get(url, params=params)
+        except httpx.HTTPError:
+            self.failures += 1
+            return None
+        self.latencies.append(time.perf_counter() - started)
+        self.status_codes[response.status_code] = self.status_codes.get(response.status_code, 0) + 1
+        if response.status_code >= 500:
+            self.failures += 1
+        return response
+
+    def report(self) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+        duration = self.finished - self.started
+        requests = len(latencies)
+
+        def percentile(value: float) -> Optional[float]:
+            if not latencies:
+                return None
+            rank = min(len(latencies) - 1, max(0, round(value / 100 * len(latencies)) - 1))
+            return round(latencies[rank] * 1000, 3)
+
+        return {
+            "requests": requests,
+            "failures": self.failures,
+            "status_codes": {str(code): count for code, count in sorted(self.status_codes.items())},
+            "duration_seconds": round(duration, 3),
+            "rps": round(requests / duration, 2) if duration > 0 else None,
+            "latency_ms": {
+                "p50": percentile(50),
+                "p95": percentile(95),
+                "p99": percentile(99),
+                "max": round(latencies[-1] * 1000, 3) if latencies else None,
+            },
+        }
+
+async def run_clients(recorder: Recorder, clients: int, client: Callable[[int], Awaitable[None]]):
+    recorder.started = time.perf_counter()
+    await asyncio.gather(*(client(index) for index in range(clients)))
+    recorder.finished = time.perf_counter()
+
+async def autocomplete_scenario(http: httpx.AsyncClient, api_url: str, catalogue: Catalogue, args) -> Recorder:
+    recorder = Recorder("autocomplete")
+    rng = random.Random(args.seed)
+
+    async def user(index: int):
+        for _ in range(args.words_per_user):
+            name = rng.choice(catalogue.games)["name"]
+            for end in range(2, min(len(name), 12) + 1):
+                await recorder.get(http, f"{api_url}/api/autocomplete", {"game": name[:end]})
+                await asyncio.sleep(args.keystroke_ms / 1000)
+
+    await run_clients(recorder, args.users, user)
+    return recorder
+
+async def search_fanin_scenario(http: httpx.AsyncClient, api_url: str, catalogue: Catalogue, args) -> Recorder:
+    recorder = Recorder("search_fanin")
+    rng = random.Random(args.seed)
+    hot_games = [game["id"] for game in catalogue.games[:args.hot_games]]
+
+    async def client(index: int):
+        for _ in range(args.searches_per_client):
+            params = {
+                "game_id": rng.choice(hot_games),
+                "sort": rng.choice(["time", "views"]),
+                "page": rng.randint(1, 5),
+                "page_size": 20,
+            }
+            await recorder.get(http, f"{api_url}/api/search", params)
+
+    await run_clients(recorder, args.clients, client)
+    return recorder
+
+async def videos_paging_scenario(http: httpx.AsyncClient, api_url: str, catalogue: Catalogue, args) -> Recorder:
+    recorder = Recorder("videos_paging")
+    hot_games = [game["id"] for game in catalogue.games[:args.hot_games]]
+
+    async def client(index: int):
+        params: Dict[str, Any] = {
+            "game_id": hot_games[index % len(hot_games)],
+            "page_size": 50,
+            "with_total": "false",
+        }
+        for _ in range(args.pages_per_client):
+            response = await recorder.get(http, f"{api_url}/api/videos", params)
+            if response is None or response.status_code != 200:
+                return
+            cursor = response.json().get("next_cursor")
+            if not cursor:
+                return
+            params["cursor"] = cursor
+
+    await run_clients(recorder, args.clients, client)
+    return recorder
+
+SCENARIOS = {
+    "autocomplete": autocomplete_scenario,
+    "search_fanin": search_fanin_scenario,
+    "videos_paging": videos_paging_scenario,
+}
+
+async def seed_videos(http: httpx.AsyncClient, api_url: str, catalogue: Catalogue, args):
+    """Searches the hot games deep enough for /api/videos to have pages to walk."""
+    for game in catalogue.games[:args.hot_games]:
+        await http.get(f"{api_url}/api/search", params={"game_id": game["id"], "page": 10, "page_size": 100})
+    # Let the persistence queue flush
+    await asyncio.sleep(3)
+
+async def wait_until_up(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as http:
+        while time.monotonic() < deadline:
+            try:
+                await http.get(url)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+def start_processes(args) -> List[subprocess.Popen]:
+    helix_url = f"http://127.0.0.1:{args.helix_port}"
+    fake_helix = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.fake_helix",
+        "--port", str(args.helix_port),
+        "--games", str(args.games),
+        "--videos-per-game", str(args.videos_per_game),
+        "--latency-ms", str(args.helix_latency_ms),
+        "--error-rate", str(args.helix_error_rate),
+        "--rate-limit", str(args.helix_rate_limit),
+        "--seed", str(args.seed),
+    ])
+    env = {
+        **os.environ,
+        "TWITCH_CLIENT_ID": "bench",
+        "TWITCH_CLIENT_SECRET": "bench",
+        "TWITCH_TOKEN_URL": f"{helix_url}/oauth2/token",
+        "TWITCH_API_URL": f"{helix_url}/helix",
+        "MONGODB_URI": args.mongodb_uri,
+        "MONGODB_DB_NAME": BENCH_DB_NAME,
+    }
+    api = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--port", str(args.api_port),
+        "--workers", str(args.api_workers),
+        "--log-level", "warning",
+    ], env=env)
+    return [fake_helix, api]
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def run(args) -> Dict[str, Any]:
+    catalogue = Catalogue(FakeHelixConfig(games=args.games, videos_per_game=args.videos_per_game, seed=args.seed))
+    api_url = args.api_url or f"http://127.0.0.1:{args.api_port}"
+    await wait_until_up(f"{api_url}/")
+
+    limits = httpx.Limits(max_connections=args.clients + args.users, max_keepalive_connections=args.clients + args.users)
+    results: Dict[str, Any] = {}
+    async with httpx.AsyncClient(limits=limits, timeout=args.timeout) as http:
+        scenarios = args.scenarios.split(",")
+        if "videos_paging" in scenarios:
+            await seed_videos(http, api_url, catalogue, args)
+        for name in scenarios:
+            recorder = await SCENARIOS[name](http, api_url, catalogue, args)
+            results[name] = recorder.report()
+            print(f"{name:<16} {json.dumps(results[name]['latency_ms'])} rps={results[name]['rps']}", file=sys.stderr)
+        try:
+            api_stats = (await http.get(f"{api_url}/api/stats")).json()
+        except (httpx.HTTPError, ValueError):
+            api_stats = None
+
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "scenarios": results,
+        "api_stats": api_stats,
+    }
+
+def drop_bench_database(mongodb_uri: str):
+    from pymongo import MongoClient
+
+    client = MongoClient(mongodb_uri, serverSelectionTimeoutMS=5000)
+    try:
+        client.drop_database(BENCH_DB_NAME)
+    finally:
+        client.close()
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Load test the API against a fake Helix server")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma-separated scenarios to run")
+    parser.add_argument("--output", help="JSON report path (stdout if omitted)")
+    parser.add_argument("--api-url", help="test an already running API instead of starting one")
+    parser.add_argument("--api-port", type=int, default=8800)
+    parser.add_argument("--api-workers", type=int, default=1)
+    parser.add_argument("--mongodb-uri", default="mongodb://localhost:27017")
+    parser.add_argument("--helix-port", type=int, default=8900)
+    parser.add_argument("--helix-latency-ms", type=float, default=20.0)
+    parser.add_argument("--helix-error-rate", type=float, default=0.0)
+    parser.add_argument("--helix-rate-limit", type=int, default=800)
+    parser.add_argument("--games", type=int, default=500)
+    parser.add_argument("--videos-per-game", type=int, default=2000)
+    parser.add_argument("--hot-games", type=int, default=5)
+    parser.add_argument("--users", type=int, default=20, help="typing users in the autocomplete scenario")
+    parser.add_argument("--words-per-user", type=int, default=5)
+    parser.add_argument("--keystroke-ms", type=float, default=80.0)
+    parser.add_argument("--clients", type=int, default=50, help="concurrent clients in the other scenarios")
+    parser.add_argument("--searches-per-client", type=int, default=20)
+    parser.add_argument("--pages-per-client", type=int, default=30)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    unknown = set(args.scenarios.split(",")) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    processes: List[subprocess.Popen] = []
+    if not args.api_url:
+        drop_bench_database(args.mongodb_uri)
+        processes = start_processes(args)
+    try:
+        report = asyncio.run(run(args))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=10)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Micro-benchmark of the /api/videos response encoding.
+
+Compares the default path (response model validation, `jsonable_encoder`,
+stdlib `json`) with `FastJSONResponse` on a page of synthetic videos shaped
+like the documents stored in MongoDB. Run from the backend folder:
+
+    python -m benchmarks.serialization --page-size 100
+"""
+import argparse
+import timeit
+from typing import Any, Callable, Dict, List
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.api.schemas import VideoListResponse
+from app.core import responses
+from app.core.responses import FastJSONResponse
+from benchmarks.fixtures import helix_video
+
+def make_video(index: int) -> Dict[str, Any]:
+    # Stored document: thumbnail size filled in, game and trending score added
+    return {
+        **helix_video(index),
+        "thumbnail_url": "https://static-cdn.jtvnw.net/cf_vods/1920x1080/thumb.jpg",
+        "game_id": "21779",
+        "trending_score": 12.5 + index,
+    }
+
+def make_page(page_size: int) -> Dict[str, Any]:
+    return {
+        "videos": [make_video(index) for index in range(page_size)],
+        "total": 10000,
+        "page": 1,
+        "page_size": page_size,
+        "pages": -(-10000 // page_size),
+        "next_cursor": "eyJzIjoidGltZSJ9",
+    }
+
+def default_path(content: Dict[str, Any]) -> bytes:
+    # What FastAPI does with a dict returned by a route with a response_model
+    validated = VideoListResponse.model_validate(content)
+    return JSONResponse(jsonable_encoder(validated.model_dump(mode="json"))).body
+
+def fast_path(content: Dict[str, Any]) -> bytes:
+    return FastJSONResponse(content).body
+
+def bench(name: str, fn: Callable[[Dict[str, Any]], bytes], content: Dict[str, Any], number: int, repeat: int) -> float:
+    best = min(timeit.repeat(lambda: fn(content), number=number, repeat=repeat)) / number
+    print(f"{name:<24} {best * 1e6:10.1f} µs/response")
+    return best
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Benchmark video list response encoding")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--number", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    content = make_page(args.page_size)
+    encoder = "orjson" if responses.orjson is not None else "json"
+    print(f"{args.page_size} videos per response, FastJSONResponse encoder: {encoder}")
+
+    default = bench("default (validated)", default_path, content, args.number, args.repeat)
+    fast = bench("FastJSONResponse", fast_path, content, args.number, args.repeat)
+    print(f"speedup: {default / fast:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Cold start benchmark of the API.
+
+Measures, in fresh processes, the time to import `app.main` and the time
+from spawning uvicorn to the first answered request (lifespan warm-up
+included). The API uses the fake Helix server if `--helix-url` is given,
+and MongoDB at `MONGODB_URI`. Run from the backend folder:
+
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --workers 4 --helix-url http://127.0.0.1:8900
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+import httpx
+
+_IMPORT_SNIPPET = "import time; started = time.perf_counter(); import app.main; print(time.perf_counter() - started)"
+
+def api_env(helix_url: Optional[str]) -> Dict[str, str]:
+    env = {
+        **os.environ,
+        "TWITCH_CLIENT_ID": os.environ.get("TWITCH_CLIENT_ID", "bench"),
+        "TWITCH_CLIENT_SECRET": os.environ.get("TWITCH_CLIENT_SECRET", "bench"),
+    }
+    if helix_url:
+        env["TWITCH_TOKEN_URL"] = f"{helix_url}/oauth2/token"
+        env["TWITCH_API_URL"] = f"{helix_url}/helix"
+    return env
+
+def import_time(env: Dict[str, str]) -> float:
+    output = subprocess.check_output([sys.executable, "-c", _IMPORT_SNIPPET], env=env, stderr=subprocess.DEVNULL)
+    return float(output.decode().strip().splitlines()[-1])
+
+def time_to_first_response(env: Dict[str, str], port: int, workers: int, timeout: float) -> float:
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        env=env,
+    )
+    try:
+        with httpx.Client() as http:
+            while time.perf_counter() - started < timeout:
+                try:
+                    if http.get(f"http://127.0.0.1:{port}/").status_code == 200:
+                        return time.perf_counter() - started
+                except httpx.HTTPError:
+                    pass
+                time.sleep(0.01)
+        raise RuntimeError(f"the API did not answer within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+def summary(name: str, values: List[float]):
+    print(f"{name:<24} median {statistics.median(values) * 1000:8.1f} ms   min {min(values) * 1000:8.1f} ms")
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark the API cold start")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8810)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--helix-url", help="fake Helix server, e.g. http://127.0.0.1:8900")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args(argv)
+
+    env = api_env(args.helix_url)
+    summary("import app.main", [import_time(env) for _ in range(args.runs)])
+    summary("first response", [
+        time_to_first_response(env, args.port, args.workers, args.timeout) for _ in range(args.runs)
+    ])
+
+if __name__ == "__main__":
+    main()